@@ -0,0 +1,75 @@
+import asyncio
+import os
+from logging.config import fileConfig
+
+from dotenv import load_dotenv
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import context
+
+from core.orm import Base
+
+load_dotenv()
+
+config = context.config
+
+# Callers that set up logging themselves (benchmarks) pass configure_logger=False
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def database_url() -> str:
+    url = config.attributes.get("url") or os.getenv("POSTGRES_URL")
+    if not url:
+        raise RuntimeError("POSTGRES_URL is not set")
+    return url
+
+
+def run_migrations_offline() -> None:
+    """
+    Print the SQL of the migrations instead of running them (alembic upgrade head --sql).
+    """
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    # One transaction per migration, online migrations commit it to build indexes and backfill outside of it
+    context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(database_url(), poolclass=pool.NullPool)
+
+    async with connectable.connect() as connection:
+        # Fail fast instead of queueing behind long transactions, queued DDL locks block every query of the table
+        await connection.exec_driver_sql(f"SET lock_timeout = '{os.getenv('MIGRATION_LOCK_TIMEOUT', '5s')}'")
+        await connection.commit()
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
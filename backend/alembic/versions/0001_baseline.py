@@ -0,0 +1,117 @@
+"""Baseline schema, as created by create_all before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+A database created by create_all of an earlier build is adopted with
+`alembic stamp 0001` and then `alembic upgrade head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rooms",
+        sa.Column("room", sa.Integer(), autoincrement=True, nullable=False),
+        sa.PrimaryKeyConstraint("room"),
+    )
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(length=256), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("username", sa.String(length=60), nullable=False),
+        sa.Column("password", sa.LargeBinary(), nullable=False),
+        sa.Column("fullname", sa.String(length=256), nullable=False),
+        sa.Column("email", sa.String(length=60), nullable=True),
+        sa.Column("phone", sa.String(length=60), nullable=True),
+        sa.Column("staff", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("username"),
+        sa.UniqueConstraint("email"),
+        sa.UniqueConstraint("phone"),
+    )
+    op.create_table(
+        "storages",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("room_id", sa.Integer(), nullable=False),
+        sa.Column("shelf", sa.String(length=256), nullable=False),
+        sa.ForeignKeyConstraint(["room_id"], ["rooms.room"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "activities",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(length=256), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("date", sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+        sa.Column("room_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["room_id"], ["rooms.room"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "exhibits",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("name", sa.String(length=60), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("date_of_creation", sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+        sa.Column("author", sa.String(length=256), nullable=True),
+        sa.Column("material", sa.String(length=256), nullable=True),
+        sa.Column("storage_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["category_id"], ["categories.id"], ondelete="SET NULL"),
+        sa.ForeignKeyConstraint(["storage_id"], ["storages.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "tickets",
+        sa.Column("id", postgresql.UUID(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("activity_id", sa.Integer(), nullable=False),
+        sa.Column("cost", sa.Float(), nullable=False),
+        sa.Column("date", sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+        sa.Column("visited", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["activity_id"], ["activities.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "receipts",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("ticket_id", postgresql.UUID(), nullable=False),
+        sa.Column("acivity_id", sa.Integer(), nullable=False),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("date", sa.DateTime(), server_default=sa.text("TIMEZONE('utc', now())"), nullable=False),
+        sa.ForeignKeyConstraint(["acivity_id"], ["activities.id"]),
+        sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("receipts")
+    op.drop_table("tickets")
+    op.drop_table("exhibits")
+    op.drop_table("activities")
+    op.drop_table("storages")
+    op.drop_table("users")
+    op.drop_table("categories")
+    op.drop_table("rooms")
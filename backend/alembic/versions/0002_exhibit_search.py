@@ -0,0 +1,86 @@
+"""Exhibit search column, its GIN index and trigram indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00.000000
+
+The column is kept up to date by a trigger instead of being a generated
+column, adding a stored generated column rewrites the whole table under
+an exclusive lock. Existing rows are backfilled in batches.
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from common.db.migrations import backfill, create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def document(row: str) -> str:
+    return (
+        f"setweight(to_tsvector('simple', coalesce({row}name, '')), 'A') || "
+        f"setweight(to_tsvector('simple', coalesce({row}author, '')), 'B') || "
+        f"setweight(to_tsvector('simple', coalesce({row}material, '')), 'C') || "
+        f"setweight(to_tsvector('simple', coalesce({row}description, '')), 'D')"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # A generated column made by create_all of an earlier build can not be written by the trigger
+    generated = not op.get_context().as_sql and bind.execute(sa.text(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'exhibits' AND column_name = 'search' AND is_generated = 'ALWAYS'"
+    )).first()
+    if generated:
+        op.drop_column("exhibits", "search")
+
+    op.execute("ALTER TABLE exhibits ADD COLUMN IF NOT EXISTS search tsvector")
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION exhibits_search() RETURNS trigger AS $$
+        BEGIN
+            NEW.search := {document("NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS exhibits_search ON exhibits")
+    op.execute(
+        "CREATE TRIGGER exhibits_search BEFORE INSERT OR UPDATE OF name, author, material, description "
+        "ON exhibits FOR EACH ROW EXECUTE FUNCTION exhibits_search()"
+    )
+
+    backfill("exhibits", f"search = {document('')}", "search IS NULL")
+    create_index_concurrently("ix_exhibits_search", "exhibits", ["search"], postgresql_using="gin")
+
+    # Fuzzy search needs pg_trgm, which is not installed on every server
+    if op.get_context().as_sql:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    else:
+        try:
+            with bind.begin_nested():
+                op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except sa.exc.DBAPIError as e:
+            logging.warning("pg_trgm is not available, exhibit search will not be fuzzy: %s", e.orig)
+            return
+
+    create_index_concurrently("ix_exhibits_name_trgm", "exhibits", ["name"], postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+    create_index_concurrently("ix_exhibits_author_trgm", "exhibits", ["author"], postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"})
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_exhibits_author_trgm", "exhibits")
+    drop_index_concurrently("ix_exhibits_name_trgm", "exhibits")
+    drop_index_concurrently("ix_exhibits_search", "exhibits")
+    op.execute("DROP TRIGGER IF EXISTS exhibits_search ON exhibits")
+    op.execute("DROP FUNCTION IF EXISTS exhibits_search()")
+    op.drop_column("exhibits", "search")
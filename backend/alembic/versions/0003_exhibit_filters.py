@@ -0,0 +1,36 @@
+"""Indexes of the exhibit list filters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from common.db.migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_storages_room_id", "storages", ["room_id"]),
+    ("ix_exhibits_category_id", "exhibits", ["category_id", "id"]),
+    ("ix_exhibits_storage_id", "exhibits", ["storage_id", "id"]),
+    ("ix_exhibits_material", "exhibits", ["material", "id"]),
+    ("ix_exhibits_author", "exhibits", ["author", "id"]),
+    ("ix_exhibits_date_of_creation", "exhibits", ["date_of_creation"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        create_index_concurrently(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, columns in reversed(INDEXES):
+        drop_index_concurrently(name, table)
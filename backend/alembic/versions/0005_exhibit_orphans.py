@@ -0,0 +1,30 @@
+"""Let exhibits outlive their category and storage
+
+ON DELETE SET NULL of exhibits.category_id and storage_id failed on their NOT NULL.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column("exhibits", "category_id", nullable=True)
+    op.alter_column("exhibits", "storage_id", nullable=True)
+
+
+def downgrade() -> None:
+    # Fails while exhibits without a category or storage exist
+    op.alter_column("exhibits", "storage_id", nullable=False)
+    op.alter_column("exhibits", "category_id", nullable=False)
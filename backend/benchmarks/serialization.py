@@ -0,0 +1,137 @@
+"""
+Cost per row of building and encoding the exhibit and ticket responses.
+
+Every case turns rows shaped like the query results into the JSON body:
+the current path (model_validate, to_dict, stdlib json as used by
+web.json_response) against model_dump(mode="json"), TypeAdapter.dump_json,
+orjson when it is installed and the JSON_ENCODER encoder of common.responses. No database is needed.
+
+Usage (from backend/):
+    python benchmarks/serialization.py --rows 1 1000 100000 --json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from collections import namedtuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pydantic import TypeAdapter
+
+from annotations.objects import Exhibit, Ticket
+from annotations.rows import from_rows
+from common.responses import dumps
+from endpoints.exhibits import exhibit_from_row
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Rows support attribute and index access and have _fields, like sqlalchemy Row
+ExhibitRow = namedtuple("ExhibitRow", "id name description date_of_creation author material category_id category_name storage_id storage_room_id storage_shelf")
+TicketRow = namedtuple("TicketRow", "id user_id activity_id cost date visited")
+
+
+def exhibit_rows(n: int) -> list:
+    start = datetime(2024, 1, 1)
+    return [
+        ExhibitRow(
+            id=i, name=f"exhibit {i}", description="seeded by benchmark", date_of_creation=start + timedelta(minutes=i),
+            author=f"author {i % 1000}", material="clay",
+            category_id=i % 100, category_name=f"category {i % 100}",
+            storage_id=i % 500, storage_room_id=i % 50, storage_shelf=f"shelf {i % 500}",
+        )
+        for i in range(n)
+    ]
+
+
+def ticket_rows(n: int) -> list:
+    start = datetime(2024, 1, 1)
+    return [
+        TicketRow(id=uuid.uuid4(), user_id=i % 1000, activity_id=i % 100, cost=100.0 + i % 900, date=start + timedelta(minutes=i), visited=i % 3 == 0)
+        for i in range(n)
+    ]
+
+
+exhibits_adapter = TypeAdapter(list[Exhibit])
+tickets_adapter = TypeAdapter(list[Ticket])
+
+
+# "build only" is the share of model validation in the other cases
+EXHIBIT_CASES = {
+    "build only": lambda rows: [exhibit_from_row(i) for i in rows],
+    "to_dict + json": lambda rows: json.dumps([exhibit_from_row(i).to_dict() for i in rows]).encode(),
+    "model_dump(json) + json": lambda rows: json.dumps([exhibit_from_row(i).model_dump(mode="json") for i in rows]).encode(),
+    "TypeAdapter.dump_json": lambda rows: exhibits_adapter.dump_json([exhibit_from_row(i) for i in rows]),
+    "responses.dumps": lambda rows: dumps([exhibit_from_row(i) for i in rows]),
+}
+
+TICKET_CASES = {
+    "build only": lambda rows: [Ticket.model_validate(i) for i in rows],
+    "to_dict + json": lambda rows: json.dumps([Ticket.model_validate(i).to_dict() for i in rows]).encode(),
+    "model_dump(json) + json": lambda rows: json.dumps([Ticket.model_validate(i).model_dump(mode="json") for i in rows]).encode(),
+    "TypeAdapter.dump_json": lambda rows: tickets_adapter.dump_json([Ticket.model_validate(i) for i in rows]),
+    "responses.dumps": lambda rows: dumps([Ticket.model_validate(i) for i in rows]),
+    "from_rows + responses.dumps": lambda rows: dumps(from_rows(Ticket, rows)),
+}
+
+if orjson is not None:
+    EXHIBIT_CASES["model_dump + orjson"] = lambda rows: orjson.dumps([exhibit_from_row(i).model_dump() for i in rows])
+    TICKET_CASES["model_dump + orjson"] = lambda rows: orjson.dumps([Ticket.model_validate(i).model_dump() for i in rows])
+
+
+def measure(fn, rows: list, min_time: float, repeat: int) -> float:
+    """
+    Best time of one call over `repeat` rounds, each round runs long enough for the clock.
+    """
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(rows)
+        if time.perf_counter() - start >= min_time:
+            break
+        calls *= 10
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(rows)
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 1000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds of one round")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for name, make_rows, cases in (("exhibits", exhibit_rows, EXHIBIT_CASES), ("tickets", ticket_rows, TICKET_CASES)):
+        for n in args.rows:
+            rows = make_rows(n)
+            for case, fn in cases.items():
+                seconds = measure(fn, rows, args.min_time, args.repeat)
+                results.append({
+                    "dto": name, "rows": n, "case": case,
+                    "seconds": seconds, "us_per_row": seconds / n * 1e6, "bytes": len(body) if isinstance(body := fn(rows), bytes) else None,
+                })
+                if not args.json:
+                    print(f"{name:>8} {n:>7} rows  {case:<24} {seconds * 1000:10.3f} ms  {seconds / n * 1e6:8.2f} us/row")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, ConfigDict, EmailStr, Field, UUID4, HttpUrl, Secret
+from pydantic import AliasChoices, BaseModel, ConfigDict, EmailStr, Field, UUID4, HttpUrl, Secret
 
 
 class UserAddDTO(BaseModel):
@@ -146,8 +146,9 @@ class Exhibit(BaseModel):
     author: Optional[str] = Field(description="Author name", max_length=256)
     material: Optional[str] = Field(max_length=256)
     
-    category: Category
-    storage: Storage
+    # None once the category or storage is deleted (ON DELETE SET NULL)
+    category: Optional[Category] = None
+    storage: Optional[Storage] = None
 
 
     def to_dict(self):
@@ -159,11 +160,35 @@ class Exhibit(BaseModel):
             "author": self.author,
             "material": self.material,
             
-            "category": self.category.model_dump(),
-            "storage": self.storage.model_dump(),
+            "category": None if self.category is None else self.category.model_dump(),
+            "storage": None if self.storage is None else self.storage.model_dump(),
         }
 
 
+class ExhibitFilter(BaseModel):
+    category_id: Optional[int] = None
+    storage_id: Optional[int] = None
+    room_id: Optional[int] = None
+    material: Optional[str] = None
+    author: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    def is_empty(self) -> bool:
+        return all(i is None for i in self.__dict__.values())
+
+
+
+class RowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[RowError]
+
+
 
 class ActivityAddDTO(BaseModel):
     
@@ -202,20 +227,19 @@ class TicketAddDTO(BaseModel):
 class Ticket(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
-    uuid: UUID4
-    user: int | User
-    activity: int  | Activity
+    uuid: UUID4 = Field(validation_alias=AliasChoices("uuid", "id"))
+    user: int | User = Field(validation_alias=AliasChoices("user", "user_id"))
+    activity: int  | Activity = Field(validation_alias=AliasChoices("activity", "activity_id"))
     cost: float
     date: datetime
     visited: bool
 
     def to_dict(self):
         return {
-            "uuid": self.uuid,
+            "uuid": str(self.uuid),
             "user": self.user,
             "activity": self.activity,
             "cost": self.cost,
-            "ticket": self.ticket,
             "date": str(self.date),
             "visited": self.visited,
         }
@@ -223,6 +247,19 @@ class Ticket(BaseModel):
 
 
 
+class TicketsBatchAddDTO(BaseModel):
+    tickets: list[TicketAddDTO] = Field(min_length=1, max_length=1000)
+
+class TicketsBatchVisitDTO(BaseModel):
+    uuids: list[UUID4] = Field(min_length=1, max_length=1000)
+    visited: bool = True
+
+class TicketsBatchDeleteDTO(BaseModel):
+    uuids: list[UUID4] = Field(min_length=1, max_length=1000)
+
+
+
+
 class ReceiptAddDTO(BaseModel):
     user: int | User
     ticket: int | Ticket
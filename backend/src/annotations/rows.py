@@ -0,0 +1,100 @@
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+from pydantic import AliasChoices, BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+_setattr = object.__setattr__
+
+_plans: dict[tuple[type[BaseModel], tuple[str, ...]], tuple[tuple[str, ...], Callable, dict]] = {}
+
+
+def _plain(model: type[BaseModel]) -> bool:
+    return not model.__private_attributes__ and model.model_config.get("extra") != "allow" and model.__pydantic_post_init__ is None
+
+
+def construct(model: type[M], values: dict, fields_set: Optional[set[str]] = None) -> M:
+    """
+    Same as model.model_construct(fields_set, **values) for values of every field keyed by field name,
+    without its per field alias lookups.
+    """
+    if not _plain(model):
+        return model.model_construct(fields_set, **values)
+
+    instance = model.__new__(model)
+    _setattr(instance, "__dict__", values)
+    _setattr(instance, "__pydantic_fields_set__", set(values) if fields_set is None else fields_set)
+    _setattr(instance, "__pydantic_extra__", None)
+    _setattr(instance, "__pydantic_private__", None)
+    return instance
+
+
+def _columns(field_name: str, field) -> list[str]:
+    names = [field_name]
+    if field.alias is not None:
+        names.append(field.alias)
+    if isinstance(field.validation_alias, AliasChoices):
+        names += [i for i in field.validation_alias.choices if isinstance(i, str)]
+    elif isinstance(field.validation_alias, str):
+        names.append(field.validation_alias)
+    return names
+
+
+def _plan(model: type[BaseModel], columns: tuple[str, ...]) -> tuple[tuple[str, ...], Callable, dict]:
+    """
+    Field names, a getter of their values from rows with these columns and the fields
+    without a column, which get their defaults. Found once per query shape.
+    """
+    key = (model, columns)
+    plan = _plans.get(key)
+    if plan is None:
+        index = {name: i for i, name in enumerate(columns)}
+        names, positions, defaults = [], [], {}
+        for name, field in model.model_fields.items():
+            position = next((index[i] for i in _columns(name, field) if i in index), None)
+            if position is not None:
+                names.append(name)
+                positions.append(position)
+            elif field.is_required():
+                raise ValueError(f"{model.__name__}.{name} has no column in {columns}")
+            else:
+                defaults[name] = field
+
+        getter = itemgetter(*positions)
+        if len(positions) == 1:
+            getter = lambda row, get=getter: (get(row),)
+        plan = _plans[key] = (tuple(names), getter, defaults)
+    return plan
+
+
+def _build(model: type[M], plan, row) -> M:
+    names, getter, defaults = plan
+    values = dict(zip(names, getter(row)))
+    fields_set = set(values)
+    for name, field in defaults.items():
+        values[name] = field.get_default(call_default_factory=True)
+    return construct(model, values, fields_set)
+
+
+def from_row(model: type[M], row: Any) -> M:
+    """
+    Build a DTO from a row of our own database without validating it again.
+    Anything that is not a Row is validated as usual.
+    """
+    fields = getattr(row, "_fields", None)
+    if fields is None:
+        return model.model_validate(row)
+    return _build(model, _plan(model, fields), row)
+
+
+def from_rows(model: type[M], rows: Iterable[Any]) -> list[M]:
+    """
+    from_row for a whole result, the columns are looked up once.
+    """
+    rows = list(rows)
+    if not rows or getattr(rows[0], "_fields", None) is None:
+        return [model.model_validate(i) for i in rows]
+
+    plan = _plan(model, rows[0]._fields)
+    return [_build(model, plan, i) for i in rows]
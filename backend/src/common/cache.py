@@ -0,0 +1,181 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import asyncpg
+from aiohttp.web import Application
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from common.db.session import after_commit, pending_writes, primary_reads, transaction
+
+MISSING = object()
+
+REFERENCE_TABLES = ("categories", "storages", "rooms")
+
+NOTIFY_CHANNEL = "cache_invalidation"
+
+
+class TTLCache:
+    """
+    Size bounded LRU cache with per entry expiry.
+    `generation` changes on every invalidation, loads that started before one must not be stored.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+        self.generation += 1
+
+    def clear(self):
+        self._data.clear()
+        self.generation += 1
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+def setup_cache(app: Application):
+    """
+    Create per process caches of the reference tables.
+    """
+    maxsize = int(os.getenv("CACHE_MAXSIZE", 1024))
+    ttl = float(os.getenv("CACHE_TTL", 300))
+
+    app["cache"] = {name: TTLCache(maxsize, ttl) for name in REFERENCE_TABLES}
+
+
+def invalidate(app: Application, name: str):
+    cache = app.get("cache")
+    if cache is not None and name in cache:
+        cache[name].clear()
+
+
+async def publish_invalidation(app: Application, name: str):
+    """
+    Tell the other app instances to drop app["cache"][name].
+    """
+    async with transaction(app) as session:
+        await session.execute(select(func.pg_notify(NOTIFY_CHANNEL, name)))
+
+
+async def cache_listener(app: Application):
+    """
+    Keep a dedicated LISTEN connection for cache invalidations while the app is running.
+    """
+    task = asyncio.create_task(_listen(app))
+    yield
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def _listen(app: Application):
+    dsn = make_url(os.getenv("POSTGRES_URL")).set(drivername="postgresql").render_as_string(hide_password=False)
+    retry = float(os.getenv("CACHE_LISTEN_RETRY", 1))
+
+    def on_notify(connection, pid, channel, payload):
+        logging.debug("Cache invalidation from %s: %s", pid, payload)
+        invalidate(app, payload)
+
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda c: lost.set())
+            await connection.add_listener(NOTIFY_CHANNEL, on_notify)
+
+            # Notifications sent while we were not listening are lost
+            for name in app["cache"]:
+                invalidate(app, name)
+
+            await lost.wait()
+            logging.warning("Cache invalidation listener disconnected")
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logging.error("Cache invalidation listener: %s", e)
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+        await asyncio.sleep(retry)
+
+
+def read_through(name: str):
+    """
+    Cache results of a data access function in app["cache"][name].
+    Misses are read from the primary. Empty results are not cached. Apps without caches and requests that wrote
+    and did not commit yet are served directly, they must see their own writes and must not cache them.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(app: Application, *args, **kwargs):
+            cache = app.get("cache")
+            if cache is None or pending_writes(app):
+                return await fn(app, *args, **kwargs)
+
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            result = cache[name].get(key)
+            if result is MISSING:
+                # A write committed during the load may have been invalidated already, its result is stale then
+                generation = cache[name].generation
+                with primary_reads():
+                    result = await fn(app, *args, **kwargs)
+                if result and cache[name].generation == generation:
+                    cache[name].set(key, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def invalidates(name: str):
+    """
+    Drop app["cache"][name] after a successful write, here and in the other app instances.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(app: Application, *args, **kwargs):
+            result = await fn(app, *args, **kwargs)
+            if app.get("cache") is not None:
+                # Delivered on commit when sharing the request transaction
+                await publish_invalidation(app, name)
+                # Dropped now and again on commit: other requests may cache the old rows until then
+                invalidate(app, name)
+                after_commit(app, lambda: invalidate(app, name))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,53 @@
+import logging
+import os
+from typing import Optional
+
+from alembic import context, op
+from sqlalchemy import text
+
+# Helpers of online migrations (alembic/versions). They run outside of the migration transaction,
+# so a failed migration leaves them done up to the failure and they are safe to run again.
+
+def create_index_concurrently(name: str, table: str, columns: list, **kw):
+    """
+    Build an index without blocking writes to the table.
+    An invalid index left by an interrupted build is dropped and built again.
+    """
+    with op.get_context().autocommit_block():
+        if not context.is_offline_mode() and op.get_bind().execute(text(
+            "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+        ), {"name": name}).first():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(name: str, table: str):
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def backfill(table: str, assignment: str, where: str, batch_size: Optional[int] = None):
+    """
+    UPDATE table SET assignment WHERE where, in transactions of batch_size rows in id order
+    so only a batch of rows is locked at a time.
+    """
+    if context.is_offline_mode():
+        op.execute(f"UPDATE {table} SET {assignment} WHERE {where}")
+        return
+
+    batch_size = batch_size or int(os.getenv("MIGRATION_BATCH_SIZE", 5000))
+    last, total = 0, 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            upper = bind.execute(text(
+                f"SELECT max(id) FROM (SELECT id FROM {table} WHERE id > :last ORDER BY id LIMIT :size) AS batch"
+            ), {"last": last, "size": batch_size}).scalar()
+            if upper is None:
+                break
+            total += bind.execute(text(
+                f"UPDATE {table} SET {assignment} WHERE id > :last AND id <= :upper AND ({where})"
+            ), {"last": last, "upper": upper}).rowcount
+            last = upper
+    logging.info("Backfilled %s rows of %s", total, table)
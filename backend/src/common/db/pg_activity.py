@@ -1,10 +1,13 @@
 import logging
+from typing import Any, Optional
 
 from aiohttp.web import Application
 from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import IntegrityError
 
 from annotations.objects import Activity, ActivityAddDTO
+from common.pagination import paginate
+from common.db.session import read_transaction, transaction
 from core.orm import ActivitiesModel
 
 async def add_activity(app: Application, activity: ActivityAddDTO) -> ActivitiesModel:
@@ -14,7 +17,7 @@ async def add_activity(app: Application, activity: ActivityAddDTO) -> Activities
 
     query = insert(ActivitiesModel).values(name=activity.name, description=activity.description, date=activity.date, room_id=activity.room).returning(ActivitiesModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -23,13 +26,13 @@ async def add_activity(app: Application, activity: ActivityAddDTO) -> Activities
 
         return result.first()
     
-async def get_activities(app: Application) -> list[ActivitiesModel]:
+async def get_activities(app: Application, limit: Optional[int] = None, after: Optional[Any] = None) -> list[ActivitiesModel]:
     """
     Get all activities from the database.
     """
-    query = select(ActivitiesModel)
+    query = paginate(select(ActivitiesModel), ActivitiesModel.id, limit, after)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result
 
@@ -39,7 +42,7 @@ async def get_activity_by_id(app: Application, id: int) -> ActivitiesModel:
     """
     query  = select(ActivitiesModel).where(ActivitiesModel.id == id)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
 
@@ -49,7 +52,7 @@ async def update_activity(app: Application, activity: Activity) -> ActivitiesMod
     """
     query = update(ActivitiesModel).where(ActivitiesModel.id  == activity.id).values(name=activity.name, description=activity.description, date=activity.date, room_id=activity.room).returning(ActivitiesModel)
     
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -64,7 +67,7 @@ async def delete_activity(app: Application, id: int) -> ActivitiesModel:
     """
     query = delete(ActivitiesModel).where(ActivitiesModel.id == id).returning(ActivitiesModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -1,12 +1,17 @@
 import logging
+from typing import Any, Optional
 
 from aiohttp.web import Application
 from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import IntegrityError
 
 from annotations.objects import Category, CategoryAddDTO
+from common.cache import invalidates, read_through
+from common.pagination import paginate
+from common.db.session import read_transaction, transaction
 from core.orm import CategoriesModel
 
+@invalidates("categories")
 async def add_category(app: Application, category: CategoryAddDTO) -> CategoriesModel:
     """
     Add a new category to the database.
@@ -14,7 +19,7 @@ async def add_category(app: Application, category: CategoryAddDTO) -> Categories
 
     query = insert(CategoriesModel).values(name=category.name).returning(CategoriesModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -23,43 +28,47 @@ async def add_category(app: Application, category: CategoryAddDTO) -> Categories
 
         return result.first()
     
-async def get_all_categories(app: Application) -> list[CategoriesModel]:
+@read_through("categories")
+async def get_all_categories(app: Application, limit: Optional[int] = None, after: Optional[Any] = None) -> list[CategoriesModel]:
     """
     Get all categories from the database.
     """
-    query = select(CategoriesModel)
+    query = paginate(select(CategoriesModel), CategoriesModel.id, limit, after)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
-        return result
+        return result.all()
 
+@read_through("categories")
 async def get_category_by_id(app: Application, id: int) -> CategoriesModel:
     """
     Get a category by its ID from the database.
     """
     query  = select(CategoriesModel).where(CategoriesModel.id == id)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
     
+@read_through("categories")
 async def get_category_by_name(app: Application, name: str) -> CategoriesModel:
     """
     Get a category by its ID from the database.
     """
     query  = select(CategoriesModel).where(CategoriesModel.name == name)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
 
+@invalidates("categories")
 async def update_category(app: Application, category: Category) -> CategoriesModel:
     """
     Set the name of a category.
     """
     query = update(CategoriesModel).where(CategoriesModel.id  == category.id).values(name=category.name).returning(CategoriesModel)
     
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -68,13 +77,14 @@ async def update_category(app: Application, category: Category) -> CategoriesMod
         return result.first()
     
 
+@invalidates("categories")
 async def delete_category(app: Application, id: int) -> CategoriesModel:
     """
     Delete a category from the database.
     """
     query = delete(CategoriesModel).where(CategoriesModel.id == id).returning(CategoriesModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
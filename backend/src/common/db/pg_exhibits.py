@@ -1,12 +1,37 @@
 import logging
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Optional
 from aiohttp.web import Application
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import REAL, and_, cast, delete, func, insert, or_, select, update
 
-from annotations.objects import Exhibit, ExhibitAddDTO
-from core.orm import ExhibitsModel
+from annotations.objects import Exhibit, ExhibitAddDTO, ExhibitFilter
+from common.importing import ImportReport
+from common.pagination import paginate
+from common.db.session import read_transaction, transaction
+from core.orm import SEARCH_CONFIG, CategoriesModel, ExhibitsModel, StorageModel
 
 
 
+# Every column but the search document, which only the search query reads
+EXHIBIT_COLUMNS = (
+    ExhibitsModel.id,
+    ExhibitsModel.name,
+    ExhibitsModel.description,
+    ExhibitsModel.date_of_creation,
+    ExhibitsModel.author,
+    ExhibitsModel.material,
+    ExhibitsModel.category_id,
+    ExhibitsModel.storage_id,
+)
+
+
+def _naive_utc(date: datetime) -> datetime:
+    # Exhibit dates are stored as UTC without a time zone
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
 async def add_exhibit(app: Application, exhibit: ExhibitAddDTO) -> ExhibitsModel:
     """
     Add an exhibit to the application.
@@ -14,7 +39,7 @@ async def add_exhibit(app: Application, exhibit: ExhibitAddDTO) -> ExhibitsModel
 
     query = insert(ExhibitsModel).values(
         exhibit.to_dict(),
-    ).returning(ExhibitsModel)
+    ).returning(*EXHIBIT_COLUMNS)
 
     # query = insert(ExhibitsModel).values(
     #     name=exhibit.name,
@@ -26,7 +51,7 @@ async def add_exhibit(app: Application, exhibit: ExhibitAddDTO) -> ExhibitsModel
     #     storage_id=exhibit.storage_id,
     # ).returning(ExhibitsModel)
 
-    async with app["db_engine"].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except Exception as e:
@@ -36,6 +61,49 @@ async def add_exhibit(app: Application, exhibit: ExhibitAddDTO) -> ExhibitsModel
         return result.first()
 
 
+async def import_exhibits(app: Application, batches: AsyncIterator[list[tuple[int, ExhibitAddDTO]]], report: ImportReport) -> ImportReport:
+    """
+    Load batches of exhibits with COPY in a single transaction.
+    Rows referencing unknown categories or storages are skipped and reported.
+    """
+
+    columns = ["name", "description", "date_of_creation", "author", "material", "category_id", "storage_id"]
+
+    # COPY skips the server default of date_of_creation, rows without a date get the time of the import.
+    # The default of ExhibitAddDTO is the time the module was imported, so an unset date counts as missing too
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    async with transaction(app) as session:
+        connection = (await session.get_raw_connection()).driver_connection
+
+        async for batch in batches:
+            categories = {i.category_id for _, i in batch}
+            storages = {i.storage_id for _, i in batch}
+            categories = set((await session.execute(select(CategoriesModel.id).where(CategoriesModel.id.in_(categories)))).scalars())
+            storages = set((await session.execute(select(StorageModel.id).where(StorageModel.id.in_(storages)))).scalars())
+
+            records = []
+            for row, exhibit in batch:
+                if exhibit.category_id not in categories:
+                    report.error(row, f"Category {exhibit.category_id} does not exist")
+                elif exhibit.storage_id not in storages:
+                    report.error(row, f"Storage {exhibit.storage_id} does not exist")
+                else:
+                    date = exhibit.date_of_creation
+                    date = now if date is None or "date_of_creation" not in exhibit.model_fields_set else _naive_utc(date)
+                    records.append((exhibit.name, exhibit.description, date, exhibit.author, exhibit.material, exhibit.category_id, exhibit.storage_id))
+
+            if records:
+                try:
+                    await connection.copy_records_to_table(ExhibitsModel.__tablename__, records=records, columns=columns)
+                except Exception as e:
+                    logging.error(e)
+                    raise e
+                report.imported += len(records)
+
+    return report
+
+
 async def update_exhibit(app: Application, exhibit: Exhibit) -> ExhibitsModel:
     """
     Edit an exhibit in the application.
@@ -49,9 +117,9 @@ async def update_exhibit(app: Application, exhibit: Exhibit) -> ExhibitsModel:
         author=exhibit.author,
         material=exhibit.material,
         # storage_id=exhibit.storage.id
-    ).returning(ExhibitsModel)
+    ).returning(*EXHIBIT_COLUMNS)
 
-    async with app["db_engine"].begin() as session:
+    async with transaction(app) as session:
         try:
             result  = await session.execute(query)
         except Exception as e:
@@ -60,13 +128,80 @@ async def update_exhibit(app: Application, exhibit: Exhibit) -> ExhibitsModel:
         return result.first()
 
 
-async def get_exhibits(app: Application) -> list[ExhibitsModel]:
+async def get_exhibits(app: Application, limit: Optional[int] = None, after: Optional[Any] = None) -> list[ExhibitsModel]:
     """
 
     """
-    query = select(ExhibitsModel)
+    query = paginate(select(*EXHIBIT_COLUMNS), ExhibitsModel.id, limit, after)
     
-    async with app["db_engine"].begin() as session:
+    async with read_transaction(app) as session:
+        try:
+            result = await session.execute(query)
+        except Exception as e:
+            logging.error(e)
+            raise e
+        return result
+
+
+def _exhibits_with_relations():
+    """
+    Select exhibits joined with their category and storage.
+    Outer joins: exhibits keep being listed after their category or storage is deleted.
+    """
+
+    return select(
+        ExhibitsModel.id,
+        ExhibitsModel.name,
+        ExhibitsModel.description,
+        ExhibitsModel.date_of_creation,
+        ExhibitsModel.author,
+        ExhibitsModel.material,
+        CategoriesModel.id.label("category_id"),
+        CategoriesModel.name.label("category_name"),
+        StorageModel.id.label("storage_id"),
+        StorageModel.room_id.label("storage_room_id"),
+        StorageModel.shelf.label("storage_shelf"),
+    ).outerjoin(
+        CategoriesModel, ExhibitsModel.category_id == CategoriesModel.id
+    ).outerjoin(
+        StorageModel, ExhibitsModel.storage_id == StorageModel.id
+    )
+
+
+def _filtered(query, filters: Optional[ExhibitFilter]):
+    """
+    Narrow a query of exhibits with their relations to the set filters.
+    Each filter is an equality or a range over an indexed column, material and author match exactly.
+    """
+
+    if filters is None:
+        return query
+
+    if filters.category_id is not None:
+        query = query.where(ExhibitsModel.category_id == filters.category_id)
+    if filters.storage_id is not None:
+        query = query.where(ExhibitsModel.storage_id == filters.storage_id)
+    if filters.room_id is not None:
+        query = query.where(StorageModel.room_id == filters.room_id)
+    if filters.material is not None:
+        query = query.where(ExhibitsModel.material == filters.material)
+    if filters.author is not None:
+        query = query.where(ExhibitsModel.author == filters.author)
+    if filters.created_from is not None:
+        query = query.where(ExhibitsModel.date_of_creation >= _naive_utc(filters.created_from))
+    if filters.created_to is not None:
+        query = query.where(ExhibitsModel.date_of_creation <= _naive_utc(filters.created_to))
+    return query
+
+
+async def get_exhibits_with_relations(app: Application, limit: Optional[int] = None, after: Optional[Any] = None, filters: Optional[ExhibitFilter] = None) -> list[ExhibitsModel]:
+    """
+    Get all exhibits with their category and storage in a single query.
+    """
+
+    query = paginate(_filtered(_exhibits_with_relations(), filters), ExhibitsModel.id, limit, after)
+
+    async with read_transaction(app) as session:
         try:
             result = await session.execute(query)
         except Exception as e:
@@ -75,14 +210,82 @@ async def get_exhibits(app: Application) -> list[ExhibitsModel]:
         return result
 
 
+async def stream_exhibits_with_relations(app: Application, batch_size: int = 1000, filters: Optional[ExhibitFilter] = None) -> AsyncIterator[ExhibitsModel]:
+    """
+    Stream all exhibits with their category and storage through a server-side cursor.
+    """
+
+    query = _filtered(_exhibits_with_relations(), filters).order_by(ExhibitsModel.id).execution_options(yield_per=batch_size)
+
+    async with read_transaction(app) as session:
+        try:
+            result = await session.stream(query)
+        except Exception as e:
+            logging.error(e)
+            raise e
+        async for row in result:
+            yield row
+
+
+async def search_exhibits(app: Application, text: str, limit: int, after: Optional[list] = None, fuzzy: bool = False) -> list[ExhibitsModel]:
+    """
+    Find exhibits by name, author, material and description, best matches first.
+    Full text matches use the GIN index on the search column. With fuzzy set,
+    names and authors similar to the text (pg_trgm) match as well.
+    Pages are keyed by (rank, id), `after` is the key of the last row of the previous page.
+    """
+
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+    rank = func.ts_rank_cd(ExhibitsModel.search, query)
+    match = ExhibitsModel.search.op("@@")(query)
+
+    if fuzzy:
+        rank = func.greatest(rank, func.similarity(ExhibitsModel.name, text), func.similarity(ExhibitsModel.author, text))
+        match = or_(match, ExhibitsModel.name.op("%")(text), ExhibitsModel.author.op("%")(text))
+
+    rank = cast(rank, REAL)
+    statement = _exhibits_with_relations().add_columns(rank.label("rank")).where(match)
+    if after is not None:
+        after_rank, after_id = after
+        statement = statement.where(or_(
+            rank < cast(after_rank, REAL),
+            and_(rank == cast(after_rank, REAL), ExhibitsModel.id > after_id),
+        ))
+    statement = statement.order_by(rank.desc(), ExhibitsModel.id).limit(limit)
+
+    async with read_transaction(app) as session:
+        try:
+            result = await session.execute(statement)
+        except Exception as e:
+            logging.error(e)
+            raise e
+        return result.all()
+
+
+async def get_exhibit_with_relations_by_id(app: Application, id: int) -> ExhibitsModel:
+    """
+    Get an exhibit by its id with its category and storage in a single query.
+    """
+
+    query = _exhibits_with_relations().where(ExhibitsModel.id == id)
+
+    async with read_transaction(app) as session:
+        try:
+            result = await session.execute(query)
+        except Exception as e:
+            logging.error(e)
+            raise e
+        return result.first()
+
+
 async def get_exhibit_by_id(app: Application, id: int)  -> ExhibitsModel:
     """
     Get an exhibit by its id.
     """
 
-    query  = select(ExhibitsModel).where(ExhibitsModel.id  == id)
+    query  = select(*EXHIBIT_COLUMNS).where(ExhibitsModel.id  == id)
 
-    async with app["db_engine"].begin() as session:
+    async with read_transaction(app) as session:
         try:
             result = await session.execute(query)
         except Exception as e:
@@ -95,9 +298,9 @@ async def delete_exhibit(app: Application, id: int) -> ExhibitsModel:
     Delete an exhibit by its id.
     """
 
-    query = delete(ExhibitsModel).where(ExhibitsModel.id == id).returning(ExhibitsModel)
+    query = delete(ExhibitsModel).where(ExhibitsModel.id == id).returning(*EXHIBIT_COLUMNS)
 
-    async with app["db_engine"].begin() as session:
+    async with transaction(app) as session:
         try:
             result  = await session.execute(query)
         except Exception as e:
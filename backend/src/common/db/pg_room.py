@@ -1,12 +1,17 @@
 import logging
+from typing import Any, Optional
 
 from aiohttp.web import Application
 from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import IntegrityError
 
 from annotations.objects import Room
+from common.cache import invalidates, read_through
+from common.pagination import paginate
+from common.db.session import read_transaction, transaction
 from core.orm import RoomsModel
 
+@invalidates("rooms")
 async def add_room(app: Application, room: Room) -> RoomsModel:
     """
     Add a new room to the database.
@@ -14,7 +19,7 @@ async def add_room(app: Application, room: Room) -> RoomsModel:
 
     query = insert(RoomsModel).values(room=room.room).returning(RoomsModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -23,23 +28,25 @@ async def add_room(app: Application, room: Room) -> RoomsModel:
 
         return result.first()
     
-async def get_all_rooms(app: Application) -> list[RoomsModel]:
+@read_through("rooms")
+async def get_all_rooms(app: Application, limit: Optional[int] = None, after: Optional[Any] = None) -> list[RoomsModel]:
     """
     Get all rooms from the database.
     """
-    query = select(RoomsModel)
+    query = paginate(select(RoomsModel), RoomsModel.room, limit, after)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
-        return result
+        return result.all()
 
+@invalidates("rooms")
 async def update_room_number(app: Application, old_number: int, new_number: int)  -> RoomsModel:
     """
     Update room number.
     """
     query = update(RoomsModel).where(RoomsModel.room  == old_number).values(room=new_number).returning(RoomsModel)
     
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -48,13 +55,14 @@ async def update_room_number(app: Application, old_number: int, new_number: int)
         return result.first()
     
 
+@invalidates("rooms")
 async def delete_room(app: Application, room: int) -> RoomsModel:
     """
     Delete a room from the database.
     """
     query = delete(RoomsModel).where(RoomsModel.room == room).returning(RoomsModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
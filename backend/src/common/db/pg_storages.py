@@ -1,12 +1,17 @@
 import logging
+from typing import Any, Optional
 
 from aiohttp.web import Application
 from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import IntegrityError
 
 from annotations.objects import StorageAddDTO, Storage
+from common.cache import invalidates, read_through
+from common.pagination import paginate
+from common.db.session import read_transaction, transaction
 from core.orm import StorageModel
 
+@invalidates("storages")
 async def add_storage(app: Application, storage: StorageAddDTO) -> StorageModel:
     """
     Add a new storage to the database.
@@ -14,7 +19,7 @@ async def add_storage(app: Application, storage: StorageAddDTO) -> StorageModel:
 
     query = insert(StorageModel).values(room_id=storage.room_id, shelf=storage.shelf).returning(StorageModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -23,43 +28,47 @@ async def add_storage(app: Application, storage: StorageAddDTO) -> StorageModel:
 
         return result.first()
     
-async def get_all_storages(app: Application) -> list[StorageModel]:
+@read_through("storages")
+async def get_all_storages(app: Application, limit: Optional[int] = None, after: Optional[Any] = None) -> list[StorageModel]:
     """
     Get all storages from the database.
     """
-    query = select(StorageModel)
+    query = paginate(select(StorageModel), StorageModel.id, limit, after)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
-        return result
+        return result.all()
 
+@read_through("storages")
 async def get_storage_by_id(app: Application, id: int) -> StorageModel:
     """
     Get a storage by its ID from the database.
     """
     query  = select(StorageModel).where(StorageModel.id == id)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
 
+@read_through("storages")
 async def get_storage_by_info(app: Application, room: int, shelf: str)  -> StorageModel:
     """
     Get a storage by its room and shelf from the database.
     """
     query  = select(StorageModel).where(StorageModel.room_id == room and StorageModel.shelf == shelf)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
 
+@invalidates("storages")
 async def update_storage(app: Application, storage: Storage) -> StorageModel:
     """
     Update storage
     """
     query = update(StorageModel).where(StorageModel.id  == storage.id).values(room_id=storage.room_id, shelf=storage.shelf).returning(StorageModel)
     
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -68,13 +77,14 @@ async def update_storage(app: Application, storage: Storage) -> StorageModel:
         return result.first()
     
 
+@invalidates("storages")
 async def delete_storage(app: Application, id: int) -> StorageModel:
     """
     Delete a storage from the database.
     """
     query = delete(StorageModel).where(StorageModel.id == id).returning(StorageModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
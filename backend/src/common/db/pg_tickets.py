@@ -1,10 +1,15 @@
 import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
 
 from aiohttp.web import Application
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import Select, delete, insert, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
 
 from annotations.objects import TicketAddDTO, Ticket
+from common.pagination import paginate
+from common.db.session import read_transaction, transaction
 from core.orm import TicketsModel
 
 async def add_ticket(app: Application, ticket: TicketAddDTO) -> TicketsModel:
@@ -14,7 +19,7 @@ async def add_ticket(app: Application, ticket: TicketAddDTO) -> TicketsModel:
 
     query = insert(TicketsModel).values(user_id=ticket.user, activity_id=ticket.activity, cost=ticket.cost).returning(TicketsModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -23,23 +28,89 @@ async def add_ticket(app: Application, ticket: TicketAddDTO) -> TicketsModel:
 
         return result.first()
     
-async def get_all_tickets(app: Application) -> list[TicketsModel]:
+async def add_tickets(app: Application, tickets: list[TicketAddDTO]) -> list[TicketsModel]:
+    """
+    Add tickets to the database with a single multi-row insert.
+    """
+
+    query = insert(TicketsModel).values([
+        {"user_id": i.user, "activity_id": i.activity, "cost": i.cost} for i in tickets
+    ]).returning(TicketsModel)
+
+    async with transaction(app) as session:
+        try:
+            result = await session.execute(query)
+        except IntegrityError as e:
+            logging.error(e)
+            raise e
+
+        return result.all()
+
+async def get_all_tickets(app: Application, limit: Optional[int] = None, after: Optional[Any] = None) -> list[TicketsModel]:
     """
     Get all storages from the database.
     """
-    query = select(TicketsModel)
+    query = paginate(select(TicketsModel), TicketsModel.id, limit, after)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result
 
-async def get_ticket_by_id(app: Application, id: int) -> TicketsModel:
+def user_tickets_query(user_id: int, limit: int, after: Optional[tuple[datetime, UUID]] = None) -> Select:
+    """
+    Tickets of a user newest first, keyed by (date, id). Read in order from ix_tickets_user_id_date.
+    """
+    query = select(TicketsModel).where(TicketsModel.user_id == user_id)
+    if after is not None:
+        query = query.where(tuple_(TicketsModel.date, TicketsModel.id) < tuple(after))
+    return query.order_by(TicketsModel.date.desc(), TicketsModel.id.desc()).limit(limit)
+
+def activity_tickets_query(activity_id: int, limit: int, after: Optional[tuple[bool, UUID]] = None, visited: Optional[bool] = None) -> Select:
+    """
+    Tickets of an activity not visited first, keyed by (visited, id). Optionally only the visited or not visited ones.
+    Read in order from ix_tickets_activity_id_visited.
+    """
+    query = select(TicketsModel).where(TicketsModel.activity_id == activity_id)
+    if visited is not None:
+        query = query.where(TicketsModel.visited == visited)
+    if after is not None:
+        query = query.where(tuple_(TicketsModel.visited, TicketsModel.id) > tuple(after))
+    return query.order_by(TicketsModel.visited, TicketsModel.id).limit(limit)
+
+async def get_user_tickets(app: Application, user_id: int, limit: int, after: Optional[tuple[datetime, UUID]] = None) -> list[TicketsModel]:
+    """
+    Get a page of tickets of a user.
+    """
+    async with read_transaction(app) as session:
+        result = await session.execute(user_tickets_query(user_id, limit, after))
+        return result.all()
+
+async def get_activity_tickets(app: Application, activity_id: int, limit: int, after: Optional[tuple[bool, UUID]] = None, visited: Optional[bool] = None) -> list[TicketsModel]:
+    """
+    Get a page of tickets of an activity.
+    """
+    async with read_transaction(app) as session:
+        result = await session.execute(activity_tickets_query(activity_id, limit, after, visited))
+        return result.all()
+
+async def stream_tickets(app: Application, batch_size: int = 1000) -> AsyncIterator[TicketsModel]:
+    """
+    Stream all tickets through a server-side cursor.
+    """
+    query = select(TicketsModel).order_by(TicketsModel.id).execution_options(yield_per=batch_size)
+
+    async with read_transaction(app) as session:
+        result = await session.stream(query)
+        async for row in result:
+            yield row
+
+async def get_ticket_by_id(app: Application, id: UUID) -> TicketsModel:
     """
     Get a storage by its ID from the database.
     """
     query  = select(TicketsModel).where(TicketsModel.id == id)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
 
@@ -47,9 +118,9 @@ async def update_ticket(app: Application, ticket: Ticket) -> TicketsModel:
     """
     Update storage
     """
-    query = update(TicketsModel).where(TicketsModel.id  == ticket.id).values(user_id=ticket.user, activity_id=ticket.activity, cost=ticket.cost).returning(TicketsModel)
+    query = update(TicketsModel).where(TicketsModel.id  == ticket.uuid).values(user_id=ticket.user, activity_id=ticket.activity, cost=ticket.cost).returning(TicketsModel)
     
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -58,13 +129,24 @@ async def update_ticket(app: Application, ticket: Ticket) -> TicketsModel:
         return result.first()
     
 
-async def delete_ticket(app: Application, id: int) -> TicketsModel:
+async def set_tickets_visited(app: Application, ids: list[UUID], visited: bool = True) -> list[TicketsModel]:
+    """
+    Mark tickets as visited (or not) by their ids in one statement.
+    """
+    query = update(TicketsModel).where(TicketsModel.id.in_(ids)).values(visited=visited).returning(TicketsModel)
+
+    async with transaction(app) as session:
+        result = await session.execute(query)
+        return result.all()
+
+
+async def delete_ticket(app: Application, id: UUID) -> TicketsModel:
     """
     Delete a storage from the database.
     """
     query = delete(TicketsModel).where(TicketsModel.id == id).returning(TicketsModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -72,3 +154,17 @@ async def delete_ticket(app: Application, id: int) -> TicketsModel:
             raise e
         return result.first()
 
+
+async def delete_tickets(app: Application, ids: list[UUID]) -> list[TicketsModel]:
+    """
+    Delete tickets by their ids in one statement.
+    """
+    query = delete(TicketsModel).where(TicketsModel.id.in_(ids)).returning(TicketsModel)
+
+    async with transaction(app) as session:
+        try:
+            result = await session.execute(query)
+        except IntegrityError as e:
+            logging.error(e)
+            raise e
+        return result.all()
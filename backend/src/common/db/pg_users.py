@@ -1,16 +1,22 @@
 import logging
+from typing import Any, Optional
 from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import IntegrityError
 from aiohttp.web import Application
 
 from annotations.objects import UserAddDTO, User
+from common.pagination import paginate
+from common.db.session import read_transaction, release, transaction
 from core.orm import UsersModel
 
 
 async def add_user(app: Application, user: UserAddDTO) -> int:
-    query = insert(UsersModel).values(username=user.username, password=user.password.get_secret_value(), fullname=user.fullname, staff=user.staff).returning(UsersModel.id)
+    # Hashing may wait in the hasher queue, do not hold a connection meanwhile
+    await release(app)
+    password = await app['password_hasher'].hash(user.password.get_secret_value())
+    query = insert(UsersModel).values(username=user.username, password=password, fullname=user.fullname, staff=user.staff).returning(UsersModel.id)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -19,9 +25,9 @@ async def add_user(app: Application, user: UserAddDTO) -> int:
 
         return result
 
-async def get_users(app: Application) -> list[UsersModel]:
-    query = select(UsersModel)
-    async with app['db_engine'].begin() as session:
+async def get_users(app: Application, limit: Optional[int] = None, after: Optional[Any] = None) -> list[UsersModel]:
+    query = paginate(select(UsersModel), UsersModel.id, limit, after)
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result
 
@@ -29,14 +35,14 @@ async def get_users(app: Application) -> list[UsersModel]:
 async def get_user_by_username(app: Application, username: str) -> UsersModel:
     query = select(UsersModel).where(UsersModel.username == username)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
 
 async def get_user_by_id(app: Application, user_id: int) -> UsersModel:
     query = select(UsersModel).where(UsersModel.id == user_id)
 
-    async with app['db_engine'].begin() as session:
+    async with read_transaction(app) as session:
         result = await session.execute(query)
         return result.first()
     
@@ -45,9 +51,11 @@ async def update_user(app: Application, user: User) -> UsersModel:
     """
     Update storage
     """
-    query = update(UsersModel).where(UsersModel.id  == user.id).values(username=user.username, password=user.password.get_secret_value(), fullname=user.fullname, email=user.email, phone=user.phone, staff=user.staff).returning(UsersModel)
+    await release(app)
+    password = await app['password_hasher'].hash(user.password.get_secret_value())
+    query = update(UsersModel).where(UsersModel.id  == user.id).values(username=user.username, password=password, fullname=user.fullname, email=user.email, phone=user.phone, staff=user.staff).returning(UsersModel)
     
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
@@ -62,7 +70,7 @@ async def delete_user(app: Application, id: int) -> UsersModel:
     """
     query = delete(UsersModel).where(UsersModel.id == id).returning(UsersModel)
 
-    async with app['db_engine'].begin() as session:
+    async with transaction(app) as session:
         try:
             result = await session.execute(query)
         except IntegrityError as e:
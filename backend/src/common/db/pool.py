@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from aiohttp.web import Application
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, TimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from common.metrics import Histogram
+from core.workers import pool_limits
+
+# Checkout wait buckets in seconds
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Window of the checkouts per second rate
+RATE_WINDOW = 60
+
+
+class PoolTelemetry:
+    """
+    Counters of one engine's connection pool.
+    """
+
+    def __init__(self, max_overflow: int):
+        self.max_overflow = max_overflow
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.pre_ping_failures = 0
+        self.liveness_failures = 0
+        self.max_overflow_used = 0
+        self.wait = Histogram(WAIT_BUCKETS)
+        self._rate = [(0, 0)] * RATE_WINDOW
+
+    def checkout(self, overflow: int):
+        self.checkouts += 1
+        self.max_overflow_used = max(self.max_overflow_used, overflow)
+
+        second = int(time.monotonic())
+        stamp, count = self._rate[second % RATE_WINDOW]
+        self._rate[second % RATE_WINDOW] = (second, count + 1 if stamp == second else 1)
+
+    def checkouts_per_second(self) -> float:
+        now = int(time.monotonic())
+        return sum(count for stamp, count in self._rate if now - RATE_WINDOW < stamp <= now) / RATE_WINDOW
+
+    def stats(self, pool: AsyncAdaptedQueuePool) -> dict:
+        return {
+            "size": pool.size(),
+            "max_overflow": self.max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow_used": self.max_overflow_used,
+            "checkouts": self.checkouts,
+            "checkouts_per_second": self.checkouts_per_second(),
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "pre_ping_failures": self.pre_ping_failures,
+            "liveness_failures": self.liveness_failures,
+            "wait_seconds": self.wait.stats(),
+        }
+
+
+class _TimedPool(AsyncAdaptedQueuePool):
+    telemetry: PoolTelemetry
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        record = super()._create_connection()
+        record.connect_seconds = time.perf_counter() - start
+        return record
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except TimeoutError:
+            self.telemetry.timeouts += 1
+            self.telemetry.wait.observe(time.perf_counter() - start)
+            raise
+        # Only the wait in the queue, not the time to open a new connection on first use or overflow
+        self.telemetry.wait.observe(time.perf_counter() - start - vars(record).pop("connect_seconds", 0.0))
+        return record
+
+
+def pool_options() -> dict:
+    """
+    Pool parameters from the environment. Size and overflow default to this worker's
+    share of POSTGRES_MAX_CONNECTIONS. Per checkout pre-ping is off by default
+    when background liveness checks are enabled with POSTGRES_LIVENESS_INTERVAL.
+    """
+    pool_size, max_overflow = pool_limits()
+    liveness = float(os.getenv("POSTGRES_LIVENESS_INTERVAL", 0))
+
+    return {
+        "pool_size": int(os.getenv("POSTGRES_POOL_SIZE", pool_size)),
+        "max_overflow": int(os.getenv("POSTGRES_MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("POSTGRES_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("POSTGRES_POOL_PRE_PING", "false" if liveness else "true").lower() in ("1", "true", "yes"),
+    }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Engine with a configured pool that counts its own checkouts, waits and failures.
+    """
+    options = pool_options()
+    telemetry = PoolTelemetry(options["max_overflow"])
+    # The pool class is recreated on dispose, keep the telemetry on the class to survive it
+    pool_class = type("TimedPool", (_TimedPool,), {"telemetry": telemetry})
+    engine = create_async_engine(url, poolclass=pool_class, future=True, **options)
+
+    @event.listens_for(engine.sync_engine.pool, "connect")
+    def on_connect(dbapi_connection, record):
+        telemetry.connects += 1
+
+    @event.listens_for(engine.sync_engine.pool, "checkout")
+    def on_checkout(dbapi_connection, record, proxy):
+        telemetry.checkout(engine.sync_engine.pool.overflow())
+
+    @event.listens_for(engine.sync_engine.pool, "invalidate")
+    def on_invalidate(dbapi_connection, record, exception):
+        telemetry.invalidations += 1
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def on_error(context):
+        if context.is_pre_ping:
+            telemetry.pre_ping_failures += 1
+
+    return engine
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.sync_engine.pool
+    return pool.telemetry.stats(pool)
+
+
+async def warm_pool(engine: AsyncEngine, connections: Optional[int] = None):
+    """
+    Open `connections` connections at once, the pool size by default, and leave them idle in the pool
+    so the first requests of a new worker do not wait for connecting.
+    """
+    pool = engine.sync_engine.pool
+    connections = pool.size() if connections is None else connections
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)), return_exceptions=True)
+    for i in opened:
+        if not isinstance(i, BaseException):
+            await i.close()
+
+    errors = [i for i in opened if isinstance(i, BaseException)]
+    if errors:
+        raise errors[0]
+
+
+async def _ping(engine: AsyncEngine):
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def _check_liveness(engines: list[AsyncEngine], interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        for engine in engines:
+            # Every idle connection, without pre-ping a stale one fails the request that checks it out
+            pool = engine.sync_engine.pool
+            pings = await asyncio.gather(*(_ping(engine) for _ in range(max(1, pool.checkedin()))), return_exceptions=True)
+            for e in pings:
+                if isinstance(e, (OSError, DBAPIError, TimeoutError)):
+                    # The failed connection is invalidated, a disconnect also invalidates every connection pooled before it
+                    pool.telemetry.liveness_failures += 1
+                    logging.error("Liveness check of %s failed: %s", engine.url.render_as_string(), e)
+                elif isinstance(e, BaseException):
+                    raise e
+
+
+async def pool_liveness(app: Application):
+    """
+    Ping the database every POSTGRES_LIVENESS_INTERVAL seconds instead of on every checkout.
+    """
+    interval = float(os.getenv("POSTGRES_LIVENESS_INTERVAL", 0))
+    task = None
+    if interval > 0:
+        engines = [app["db_engine"]]
+        if app["db_read_engines"] is not None:
+            engines += app["db_read_engines"].engines
+        task = asyncio.create_task(_check_liveness(engines, interval))
+
+    yield
+
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,66 @@
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+
+class Replicas:
+    """
+    Read-only engines used in round-robin. A replica that fails to connect
+    is skipped for `retry_after` seconds.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], retry_after: float = 30.0):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._down: dict[AsyncEngine, float] = {}
+        self._next = 0
+
+    def healthy(self, engine: AsyncEngine) -> bool:
+        return self._down.get(engine, 0) <= time.monotonic()
+
+    def mark_down(self, engine: AsyncEngine):
+        self._down[engine] = time.monotonic() + self.retry_after
+
+    async def connect(self, min_lsn: Optional[str] = None) -> Optional[AsyncConnection]:
+        """
+        Open a connection with a started transaction on the next healthy replica, None if there is none.
+        With min_lsn only replicas that replayed the WAL up to it are used.
+        """
+        for _ in range(len(self.engines)):
+            engine = self.engines[self._next % len(self.engines)]
+            self._next += 1
+            if not self.healthy(engine):
+                continue
+
+            try:
+                connection = await engine.connect()
+            except (OSError, DBAPIError) as e:
+                logging.error("Replica %s is down: %s", engine.url.render_as_string(), e)
+                self.mark_down(engine)
+                continue
+
+            await connection.begin()
+            if min_lsn is not None and not await self._replayed(connection, min_lsn):
+                await connection.close()
+                continue
+            return connection
+
+        return None
+
+    @staticmethod
+    async def _replayed(connection: AsyncConnection, lsn: str) -> bool:
+        try:
+            result = await connection.execute(text("SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)"), {"lsn": lsn})
+        except DBAPIError as e:
+            logging.error("Replication lag check failed: %s", e)
+            return False
+        # NULL outside of recovery, a promoted replica has every write
+        return result.scalar() is not False
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from aiohttp.web import Application
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# alembic.ini is next to src/ in the repository and next to the sources in the image
+CONFIG_PATHS = [os.path.join(SRC_DIR, "..", "alembic.ini"), os.path.join(SRC_DIR, "alembic.ini")]
+
+# alembic is imported on first use, workers only need it for the schema check
+
+
+class SchemaOutdated(Exception):
+    pass
+
+
+def alembic_config(url: Optional[str] = None):
+    from alembic.config import Config
+
+    path = os.getenv("ALEMBIC_CONFIG") or next((i for i in CONFIG_PATHS if os.path.exists(i)), None)
+    if path is None:
+        raise FileNotFoundError("alembic.ini not found, set ALEMBIC_CONFIG")
+
+    config = Config(path)
+    if url is not None:
+        config.attributes["url"] = url
+    return config
+
+
+def upgrade(url: str, revision: str = "head"):
+    """
+    alembic upgrade for scripts that set up logging themselves.
+    Blocking, run it in a thread from a running event loop.
+    """
+    from alembic import command
+
+    config = alembic_config(url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, revision)
+
+
+def _script_revisions() -> tuple[set, set]:
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(alembic_config())
+    return set(script.get_heads()), {i.revision for i in script.walk_revisions()}
+
+
+def _current_revisions(connection) -> set:
+    from alembic.runtime.migration import MigrationContext
+
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+
+async def check_schema(app: Application):
+    """
+    Fail when the database is behind the migrations of this build.
+    A revision this build does not know is newer, it is accepted so old workers keep running during a rolling deploy.
+    """
+    # Importing alembic and reading the migration scripts takes a while, keep it off the event loop
+    heads, known = await asyncio.to_thread(_script_revisions)
+    async with app["db_engine"].connect() as session:
+        current = await session.run_sync(_current_revisions)
+
+    if not current:
+        raise SchemaOutdated("Database has no schema version, run `alembic upgrade head` (`alembic stamp 0001` first for a schema made by create_all)")
+    if current - known:
+        logging.warning("Database schema %s is newer than this build (%s)", ", ".join(sorted(current)), ", ".join(sorted(heads)))
+    elif current != heads:
+        raise SchemaOutdated(f"Database schema {', '.join(sorted(current))} is behind {', '.join(sorted(heads))}, run `alembic upgrade head`")
@@ -0,0 +1,239 @@
+import logging
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from aiohttp.web import Application
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from common.db.replicas import Replicas
+
+
+class UnitOfWork:
+    """
+    One connection and one transaction shared by every data access call of a request.
+    The connection is checked out on first use, so requests without queries cost nothing.
+    Calls must not run concurrently (asyncio.gather) inside one unit of work.
+    Replicas behind min_lsn are not read from. With record_lsn the WAL position
+    of a committed write is kept in commit_lsn.
+    """
+
+    def __init__(self, engine: AsyncEngine, replicas: Optional[Replicas] = None, min_lsn: Optional[str] = None, record_lsn: bool = False):
+        self.engine = engine
+        self.replicas = replicas
+        self.min_lsn = min_lsn
+        self.record_lsn = record_lsn
+        self.commit_lsn: Optional[str] = None
+        self.connection: Optional[AsyncConnection] = None
+        self.read_connection: Optional[AsyncConnection] = None
+        self.failed = False
+        self.rollback_only = False
+        self.committed = False
+        # Set by transaction(), reads after a write see data other requests must not
+        self.wrote = False
+        self._after_commit: list[Callable[[], None]] = []
+
+    @asynccontextmanager
+    async def use(self):
+        if self.connection is None:
+            self.connection = await self.engine.connect()
+            await self.connection.begin()
+
+        try:
+            yield self.connection
+        except BaseException:
+            self.failed = True
+            raise
+
+    @asynccontextmanager
+    async def use_read(self):
+        """
+        Read from a replica until the unit of work writes, from the primary after that.
+        """
+        if self.connection is None and self.replicas is not None and self.read_connection is None:
+            self.read_connection = await self.replicas.connect(self.min_lsn)
+
+        if self.connection is not None or self.read_connection is None:
+            async with self.use() as connection:
+                yield connection
+        else:
+            yield self.read_connection
+
+    def after_commit(self, callback: Callable[[], None]):
+        self._after_commit.append(callback)
+
+    async def release(self):
+        """
+        Give the connections back to the pool before a long wait, the next call checks out again.
+        A unit of work that wrote keeps its transaction.
+        """
+        if self.wrote:
+            return
+        if self.read_connection is not None:
+            await self.read_connection.close()
+            self.read_connection = None
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def close(self, commit: bool):
+        if self.read_connection is not None:
+            await self.read_connection.close()
+            self.read_connection = None
+
+        if self.connection is None:
+            return
+
+        try:
+            if commit and not self.failed and not self.rollback_only:
+                await self.connection.commit()
+                self.committed = True
+                if self.record_lsn and self.wrote:
+                    try:
+                        self.commit_lsn = (await self.connection.execute(text("SELECT CAST(pg_current_wal_lsn() AS text)"))).scalar()
+                        await self.connection.rollback()
+                    except DBAPIError as e:
+                        # Committed anyway, the client may read its write from a lagging replica
+                        logging.error("Reading the commit WAL position failed: %s", e)
+                for callback in self._after_commit:
+                    callback()
+            else:
+                await self.connection.rollback()
+        finally:
+            await self.connection.close()
+            self.connection = None
+
+
+_current: ContextVar[Optional[UnitOfWork]] = ContextVar("unit_of_work", default=None)
+
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+@asynccontextmanager
+async def unit_of_work(app: Application, replicas: Optional[Replicas] = None, min_lsn: Optional[str] = None, record_lsn: bool = False):
+    """
+    Share one transaction between the data access calls made inside the block.
+    It is committed when the block exits normally, unless marked rollback_only.
+    Reads go to `replicas` when given.
+    """
+    uow = UnitOfWork(app["db_engine"], replicas, min_lsn, record_lsn)
+    token = _current.set(uow)
+    try:
+        yield uow
+    except BaseException:
+        await uow.close(commit=False)
+        raise
+    else:
+        await uow.close(commit=True)
+    finally:
+        _current.reset(token)
+
+
+@asynccontextmanager
+async def _called_from(frame, context):
+    caller, site = frame.f_code.co_name, (frame.f_code.co_filename, frame.f_lineno)
+    async with context as connection:
+        # Queries are timed per data access function, see common.metrics and common.db.tracing.
+        # info belongs to the pooled connection, later users of the connection must not inherit the caller
+        info = connection.info
+        previous = info.get("caller"), info.get("call_site")
+        info["caller"], info["call_site"] = caller, site
+        try:
+            yield connection
+        finally:
+            if previous[0] is None:
+                info.pop("caller", None)
+                info.pop("call_site", None)
+            else:
+                info["caller"], info["call_site"] = previous
+
+
+def transaction(app: Application):
+    """
+    Transaction for a data access function: the current unit of work if there is one,
+    a transaction of its own otherwise.
+    """
+    frame = sys._getframe(1)
+    uow = _current.get()
+    if uow is None or uow.engine is not app["db_engine"]:
+        return _called_from(frame, app["db_engine"].begin())
+    uow.wrote = True
+    return _called_from(frame, uow.use())
+
+
+def read_transaction(app: Application):
+    """
+    Transaction for a read-only data access function. Goes to a read replica
+    when the current unit of work allows it, or outside of a request when replicas are configured.
+    """
+    frame = sys._getframe(1)
+    uow = _current.get()
+    primary = _primary_reads.get()
+    if uow is None or uow.engine is not app["db_engine"]:
+        replicas = app.get("db_read_engines")
+        if replicas is None or primary:
+            return _called_from(frame, app["db_engine"].begin())
+        return _called_from(frame, _replica_transaction(app, replicas))
+    if primary and uow.connection is None and uow.replicas is not None:
+        # A transaction of its own, the other reads of the unit of work stay on the replica
+        return _called_from(frame, app["db_engine"].begin())
+    return _called_from(frame, uow.use_read())
+
+
+@contextmanager
+def primary_reads():
+    """
+    read_transaction goes to the primary inside the block, for reads kept
+    after the request like cache entries, which a lagging replica would keep stale.
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+@asynccontextmanager
+async def _replica_transaction(app: Application, replicas: Replicas):
+    connection = await replicas.connect()
+    if connection is None:
+        async with app["db_engine"].begin() as connection:
+            yield connection
+        return
+
+    try:
+        yield connection
+    finally:
+        await connection.close()
+
+
+async def release(app: Application):
+    """
+    Release the connections of the current unit of work while it waits on something else
+    than the database, like the password hasher. Reads before and after run in separate transactions.
+    """
+    uow = _current.get()
+    if uow is not None and uow.engine is app["db_engine"]:
+        await uow.release()
+
+
+def pending_writes(app: Application) -> bool:
+    """
+    The current unit of work has written and is not committed yet.
+    """
+    uow = _current.get()
+    return uow is not None and uow.engine is app["db_engine"] and uow.wrote and not uow.committed
+
+
+def after_commit(app: Application, callback: Callable[[], None]):
+    """
+    Run callback once the current unit of work is committed, right away outside of one.
+    """
+    uow = _current.get()
+    if uow is None or uow.engine is not app["db_engine"]:
+        callback()
+    else:
+        uow.after_commit(callback)
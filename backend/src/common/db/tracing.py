@@ -0,0 +1,124 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Call sites are logged relative to the src directory
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MAX_STATEMENT_LENGTH = 1000
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryTrace:
+    """
+    Queries made while handling one request.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+class QueryTracing:
+    """
+    Per request query tally, slow query log and query budget.
+    `slow` is the threshold in seconds, `budget` the allowed number of queries per request.
+    In strict mode the query going over the budget raises QueryBudgetExceeded.
+    """
+
+    def __init__(self, slow: Optional[float] = None, budget: Optional[int] = None, strict: bool = False):
+        self.slow = slow
+        self.budget = budget
+        self.strict = strict
+
+    def instrument(self, engine: AsyncEngine):
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, connection, cursor, statement, parameters, context, executemany):
+        context._trace_start = time.perf_counter()
+
+        trace = _trace.get()
+        if trace is None:
+            return
+        trace.queries += 1
+        if self.strict and self.budget is not None and trace.queries > self.budget:
+            raise QueryBudgetExceeded(f"Query budget of {self.budget} exceeded at {_call_site(connection)}")
+
+    def _after(self, connection, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._trace_start
+
+        trace = _trace.get()
+        if trace is not None:
+            trace.seconds += seconds
+
+        if self.slow is not None and seconds >= self.slow:
+            logging.warning(
+                "Slow query %.1f ms at %s: %s",
+                seconds * 1000, _call_site(connection), statement[:MAX_STATEMENT_LENGTH],
+            )
+
+
+_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+
+def _call_site(connection) -> str:
+    site = connection.info.get("call_site")
+    if site is None:
+        return "unknown"
+    filename, line = site
+    return f"{os.path.relpath(filename, SRC_DIR)}:{line} {connection.info['caller']}"
+
+
+def setup_query_tracing(app: web.Application):
+    """
+    Enabled by QUERY_TRACE, SLOW_QUERY_MS or DB_QUERY_BUDGET.
+    DB_QUERY_BUDGET_STRICT makes requests going over the budget fail instead of logging a warning.
+    """
+    slow = float(os.getenv("SLOW_QUERY_MS", 0)) / 1000 or None
+    budget = int(os.getenv("DB_QUERY_BUDGET", 0)) or None
+    enabled = os.getenv("QUERY_TRACE", "false").lower() in ("1", "true", "yes")
+
+    if not (enabled or slow or budget):
+        app["query_tracing"] = None
+        return
+
+    tracing = QueryTracing(slow, budget, os.getenv("DB_QUERY_BUDGET_STRICT", "false").lower() in ("1", "true", "yes"))
+    tracing.instrument(app["db_engine"])
+    if app["db_read_engines"] is not None:
+        for engine in app["db_read_engines"].engines:
+            tracing.instrument(engine)
+    app["query_tracing"] = tracing
+
+
+@web.middleware
+async def query_trace_middleware(request: web.Request, handler):
+    """
+    Count the queries of a request and their time, reported in the Server-Timing header.
+    """
+    tracing: Optional[QueryTracing] = request.app["query_tracing"]
+    if tracing is None:
+        return await handler(request)
+
+    trace = QueryTrace()
+    token = _trace.set(trace)
+    try:
+        response = await handler(request)
+    finally:
+        _trace.reset(token)
+        if tracing.budget is not None and trace.queries > tracing.budget:
+            logging.warning("%s %s made %s queries, budget is %s", request.method, request.path, trace.queries, tracing.budget)
+        logging.debug("%s %s: %s queries in %.1f ms", request.method, request.path, trace.queries, trace.seconds * 1000)
+
+    if not response.prepared:
+        response.headers["Server-Timing"] = f'db;dur={trace.seconds * 1000:.1f};desc="{trace.queries} queries"'
+    return response
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from aiohttp.web import Application
+from sqlalchemy_utils.types.password import Password
+
+from common.passwords import hash_password, load_schemes, verify_password
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Hash and verify passwords in a process pool so pbkdf2 does not block the event loop.
+    At most `workers` calls run at once, up to `max_queue` more wait for a free worker,
+    anything beyond that is rejected with HasherBusy. A pool broken by a dead worker is replaced.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 64):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.running = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._semaphore = asyncio.Semaphore(workers)
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def _submit(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # Every later call to a broken pool fails, the calls that saw it break share one replacement
+            if self._executor is executor:
+                logging.error("Password hasher pool is broken, starting a new one")
+                self.restarts += 1
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def start(self):
+        """
+        Spawn the worker processes now, they are spawned by the first calls otherwise.
+        """
+        await asyncio.gather(*(self._submit(load_schemes) for _ in range(self.workers)))
+
+    async def _run(self, fn, *args):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HasherBusy
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        try:
+            return await self._submit(fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def hash(self, secret: str) -> Password:
+        """
+        Hash a secret, the result is stored by PasswordType as is.
+        """
+        return Password(await self._run(hash_password, secret))
+
+    async def verify(self, secret: str, password: Password) -> bool:
+        return await self._run(verify_password, secret, password.hash)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def password_hasher(app: Application):
+    """
+    Own the password hashing pool for the app lifetime.
+    """
+    app["password_hasher"] = PasswordHasher(
+        workers=int(os.getenv("PASSWORD_HASH_WORKERS", 2)),
+        max_queue=int(os.getenv("PASSWORD_HASH_QUEUE", 64)),
+    )
+    yield
+    app["password_hasher"].shutdown()
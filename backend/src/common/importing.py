@@ -0,0 +1,116 @@
+import csv
+import json
+from typing import AsyncIterator
+
+from pydantic import BaseModel, ValidationError
+
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/json": "ndjson",
+}
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    """
+    Outcome of a bulk import. Only the first MAX_REPORTED_ERRORS errors are kept.
+    """
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def error(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def to_dict(self):
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+async def _lines(content: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    async for line in content:
+        yield line.decode("utf-8-sig")
+
+
+async def csv_rows(content: AsyncIterator[bytes]) -> AsyncIterator[list[tuple[int, dict]]]:
+    """
+    Parse a CSV upload with a header row into batches of (row number, row).
+    Empty cells are treated as missing values.
+    """
+    header = None
+    lines: list[str] = []
+    quotes = 0
+    row = 0
+
+    def flush():
+        nonlocal header, row
+        batch = []
+        for values in csv.reader(lines):
+            if header is None:
+                header = values
+                continue
+            row += 1
+            batch.append((row, {k: v for k, v in zip(header, values) if v != ""}))
+        lines.clear()
+        return batch
+
+    async for line in _lines(content):
+        lines.append(line)
+        quotes += line.count('"')
+        # Never split a quoted multi line cell between batches
+        if len(lines) >= BATCH_SIZE and quotes % 2 == 0:
+            yield flush()
+
+    if lines:
+        yield flush()
+
+
+async def ndjson_rows(content: AsyncIterator[bytes]) -> AsyncIterator[list[tuple[int, dict]]]:
+    """
+    Parse an NDJSON upload into batches of (row number, row). Unparsable lines are passed as None.
+    """
+    batch = []
+    row = 0
+
+    async for line in _lines(content):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            batch.append((row, json.loads(line)))
+        except json.JSONDecodeError:
+            batch.append((row, None))
+
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+async def validated(batches: AsyncIterator[list[tuple[int, dict]]], model: type[BaseModel], report: ImportReport) -> AsyncIterator[list[tuple[int, BaseModel]]]:
+    """
+    Validate batches of rows with `model`, invalid rows go to the report.
+    """
+    async for batch in batches:
+        valid = []
+        for row, data in batch:
+            if not isinstance(data, dict):
+                report.error(row, "Invalid JSON object")
+                continue
+            try:
+                valid.append((row, model.model_validate(data)))
+            except ValidationError as e:
+                report.error(row, "; ".join(f"{'.'.join(map(str, i['loc']))}: {i['msg']}" for i in e.errors()))
+        yield valid
@@ -1,3 +1,4 @@
+import hashlib
 import jwt
 import logging
 import os
@@ -5,23 +6,31 @@ import os
 from aiohttp.web import Application, HTTPUnauthorized
 from datetime import datetime, timedelta, timezone
 
-from common.db.pg_users import get_user_by_id
+from common.cache import MISSING, TTLCache
+from core.orm import UsersModel
 
-async def encode_access(app: Application, user_id: int, expiracy: timedelta = timedelta(minutes=30)) -> str:
+
+def setup_token_cache(app: Application):
+    """
+    Cache of verified tokens, every entry lives until its token expires.
+    """
+    app["token_cache"] = TTLCache(maxsize=int(os.getenv("TOKEN_CACHE_SIZE", 10000)))
+
+
+async def encode_access(app: Application, user: UsersModel, expiracy: timedelta = timedelta(minutes=30)) -> str:
     try:
-        user = await get_user_by_id(app, user_id)
         payload = {
             "user": {
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
             },
-            "expiracy": str(datetime.now(tz=timezone.utc) + expiracy)
+            "exp": datetime.now(tz=timezone.utc) + expiracy,
         }
         token = jwt.encode(payload, os.getenv("TOKEN_KEY"), algorithm="HS256")
         return token
     except Exception as e:
-        logging.error(f"Error: {e}")
+        logging.error("Error: %s", e)
 
 
 async def decode_access(app: Application, header: str, signature: bool = True) -> dict:
@@ -29,15 +38,25 @@ async def decode_access(app: Application, header: str, signature: bool = True) -
         bearer, token = header.split(" ")
         if bearer.find("Bearer") == -1:
             raise HTTPUnauthorized
-        payload = jwt.decode(token, os.getenv("TOKEN_KEY"), algorithm="HS256", options={"verify_signature": signature})
 
         if signature == False:
+            payload = jwt.decode(token, options={"verify_signature": False})
             return payload['user']
-        if payload['expiracy'] > int(datetime.now(tz=timezone.utc).timestamp()):
-            raise HTTPUnauthorized
-        
+
+        cache = app.get("token_cache")
+        key = hashlib.sha256(token.encode()).digest()
+        if cache is not None:
+            user = cache.get(key)
+            if user is not MISSING:
+                return user
+
+        payload = jwt.decode(token, os.getenv("TOKEN_KEY"), algorithms=["HS256"], options={"require": ["exp"]})
+
+        if cache is not None:
+            cache.set(key, payload['user'], ttl=payload['exp'] - datetime.now(tz=timezone.utc).timestamp())
+
         return payload['user']
 
     except Exception as e:
-        logging.error(f"Error: {e}")
-        raise HTTPUnauthorized
\ No newline at end of file
+        logging.error("Error: %s", e)
+        raise HTTPUnauthorized
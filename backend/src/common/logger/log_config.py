@@ -0,0 +1,104 @@
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Attributes every LogRecord has, anything else was passed with extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line with the time, level, logger, process, message and extra fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                data[key] = value
+
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keep only `rate` of the DEBUG records, other levels always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+class _LocalQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, leave formatting to its thread
+        return record
+
+
+def _output() -> logging.Handler:
+    filename = os.getenv("LOG_FILE", "backend.log")
+    if filename == "-":
+        handler = logging.StreamHandler(sys.stderr)
+    else:
+        handler = RotatingFileHandler(
+            filename,
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backupCount=int(os.getenv("LOG_BACKUPS", 5)),
+            encoding="utf-8",
+        )
+
+    if os.getenv("LOG_FORMAT", "json") == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(process)d %(name)s: %(message)s"))
+    return handler
+
+
+def setup_logging(workers: int = 1) -> QueueListener:
+    """
+    Log records are put on a queue and written by a listener thread, so logging never blocks the event loop.
+    With several workers the queue is shared by the forked processes and only the launcher writes the file.
+
+    LOG_LEVEL, LOG_FILE ("-" for stderr), LOG_FORMAT (json or text), LOG_MAX_BYTES and LOG_BACKUPS
+    configure the output, LOG_DEBUG_SAMPLE the share of DEBUG records kept.
+    """
+    if workers > 1:
+        records = multiprocessing.get_context("fork").Queue()
+        handler = QueueHandler(records)
+    else:
+        records = queue.SimpleQueue()
+        handler = _LocalQueueHandler(records)
+    handler.addFilter(DebugSampler(float(os.getenv("LOG_DEBUG_SAMPLE", 1))))
+
+    root = logging.getLogger()
+    for i in root.handlers[:]:
+        root.removeHandler(i)
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    listener = QueueListener(records, _output(), respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
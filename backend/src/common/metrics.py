@@ -0,0 +1,213 @@
+import bisect
+import time
+from collections import defaultdict
+
+from aiohttp import web
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Response size buckets in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Query latency buckets in seconds
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed upper bounds, the last bucket counts everything above them.
+    """
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+    def stats(self) -> dict:
+        return {"count": self.count, "sum": self.sum, "buckets": dict(self.cumulative())}
+
+
+class Metrics:
+    """
+    Request and query metrics of this worker, every worker keeps its own.
+    """
+
+    def __init__(self):
+        self.requests: defaultdict[tuple, int] = defaultdict(int)
+        self.latency: dict[tuple, Histogram] = {}
+        self.sizes: dict[tuple, Histogram] = {}
+        self.queries: dict[str, Histogram] = {}
+
+    def request(self, route: str, method: str, status: int, seconds: float, size: int):
+        self.requests[route, method, status] += 1
+
+        key = (route, method)
+        if key not in self.latency:
+            self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.sizes[key] = Histogram(SIZE_BUCKETS)
+        self.latency[key].observe(seconds)
+        self.sizes[key].observe(size)
+
+    def query(self, caller: str, seconds: float):
+        if caller not in self.queries:
+            self.queries[caller] = Histogram(QUERY_BUCKETS)
+        self.queries[caller].observe(seconds)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+class _Exposition:
+    """
+    Prometheus text format writer.
+    """
+
+    def __init__(self):
+        self.lines: list[str] = []
+        self._declared: set[str] = set()
+
+    def _declare(self, name: str, kind: str, help: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, kind: str, help: str, value: float, **labels):
+        self._declare(name, kind, help)
+        self.lines.append(f"{name}{{{_labels(**labels)}}} {value}" if labels else f"{name} {value}")
+
+    def histogram(self, name: str, help: str, histogram: Histogram, **labels):
+        self._declare(name, "histogram", help)
+        for le, count in histogram.cumulative():
+            self.lines.append(f"{name}_bucket{{{_labels(**labels, le=le)}}} {count}")
+        self.lines.append(f"{name}_sum{{{_labels(**labels)}}} {histogram.sum}")
+        self.lines.append(f"{name}_count{{{_labels(**labels)}}} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _pool(out: _Exposition, engine: AsyncEngine, name: str):
+    pool = engine.sync_engine.pool
+    stats = pool.telemetry.stats(pool)
+
+    for key in ("size", "max_overflow", "checked_out", "idle", "overflow"):
+        out.sample(f"db_pool_{key}", "gauge", f"Connection pool {key.replace('_', ' ')}", stats[key], engine=name)
+    for key in ("checkouts", "connects", "invalidations", "timeouts", "pre_ping_failures", "liveness_failures"):
+        out.sample(f"db_pool_{key}_total", "counter", f"Connection pool {key.replace('_', ' ')}", stats[key], engine=name)
+    out.histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection", pool.telemetry.wait, engine=name)
+
+
+def render_metrics(app: web.Application) -> str:
+    metrics: Metrics = app["metrics"]
+    out = _Exposition()
+
+    for (route, method, status), count in metrics.requests.items():
+        out.sample("http_requests_total", "counter", "Handled requests", count, route=route, method=method, status=status)
+    for (route, method), histogram in metrics.latency.items():
+        out.histogram("http_request_duration_seconds", "Request latency", histogram, route=route, method=method)
+    for (route, method), histogram in metrics.sizes.items():
+        out.histogram("http_response_size_bytes", "Response body size", histogram, route=route, method=method)
+    for caller, histogram in metrics.queries.items():
+        out.histogram("db_query_duration_seconds", "Query latency per data access function", histogram, function=caller)
+
+    _pool(out, app["db_engine"], "primary")
+    if app["db_read_engines"] is not None:
+        for i, engine in enumerate(app["db_read_engines"].engines):
+            _pool(out, engine, f"replica{i}")
+            out.sample("db_replica_healthy", "gauge", "Replica is in rotation", int(app["db_read_engines"].healthy(engine)), engine=f"replica{i}")
+
+    caches = dict(app.get("cache") or {})
+    if app.get("token_cache") is not None:
+        caches["token"] = app["token_cache"]
+    for name, cache in caches.items():
+        stats = cache.stats()
+        out.sample("cache_hits_total", "counter", "Cache hits", stats["hits"], cache=name)
+        out.sample("cache_misses_total", "counter", "Cache misses", stats["misses"], cache=name)
+        out.sample("cache_size", "gauge", "Cached entries", stats["size"], cache=name)
+
+    if "password_hasher" in app:
+        stats = app["password_hasher"].stats()
+        for key in ("workers", "running", "queued", "max_queued"):
+            out.sample(f"password_hasher_{key}", "gauge", f"Password hasher {key.replace('_', ' ')}", stats[key])
+        for key in ("completed", "rejected"):
+            out.sample(f"password_hasher_{key}_total", "counter", f"Password hasher {key} calls", stats[key])
+        out.sample("password_hasher_restarts_total", "counter", "Password hasher pools replaced after a worker died", stats["restarts"])
+
+    if "startup" in app:
+        profile = app["startup"]
+        for phase, seconds in profile.phases.items():
+            out.sample("app_startup_phase_seconds", "gauge", "Duration of a startup phase of this worker", seconds, phase=phase)
+        out.sample("app_ready", "gauge", "Worker finished warming up", int(profile.ready is not None))
+
+    return out.render()
+
+
+def _route(request: web.Request) -> str:
+    route = request.match_info.route
+    if route.name:
+        return route.name
+    # Unnamed routes are labelled with their pattern, never with the raw path
+    return route.resource.canonical if route.resource is not None else "unmatched"
+
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler):
+    """
+    Count requests and record their latency and response size per route name.
+    """
+    start = time.perf_counter()
+    status, size = 500, 0
+    try:
+        response = await handler(request)
+        status = response.status
+        size = response.body_length if response.prepared else response.content_length or 0
+        return response
+    except web.HTTPException as e:
+        status, size = e.status, e.content_length or 0
+        raise
+    finally:
+        request.app["metrics"].request(_route(request), request.method, status, time.perf_counter() - start, size)
+
+
+def _instrument(metrics: Metrics, engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before(connection, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after(connection, cursor, statement, parameters, context, executemany):
+        metrics.query(connection.info.get("caller", "unknown"), time.perf_counter() - context._query_start)
+
+
+def setup_metrics(app: web.Application):
+    """
+    Collect request metrics and per data access function query timings of the app engines.
+    """
+    app["metrics"] = Metrics()
+    _instrument(app["metrics"], app["db_engine"])
+    if app["db_read_engines"] is not None:
+        for engine in app["db_read_engines"].engines:
+            _instrument(app["metrics"], engine)
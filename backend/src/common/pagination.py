@@ -0,0 +1,93 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Union
+from uuid import UUID
+
+from sqlalchemy import Select
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the key of the last row of a page into an opaque cursor token.
+    """
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _key_value(value: Any, type_: type) -> Any:
+    # bool is an int to isinstance, a cursor true is not an id
+    if isinstance(value, bool) and type_ is not bool:
+        raise TypeError(value)
+    if type_ is float and isinstance(value, (int, float)):
+        return float(value)
+    if type_ in (datetime, UUID) and isinstance(value, str):
+        return datetime.fromisoformat(value) if type_ is datetime else UUID(value)
+    if not isinstance(value, type_):
+        raise TypeError(value)
+    return value
+
+
+def decode_cursor(token: Optional[str], *types: type) -> Optional[Any]:
+    """
+    Decode a cursor token made by `encode_cursor` for a key of columns of `types`
+    (int, float, str, bool, datetime or UUID). Raises InvalidCursor when the values do not fit them.
+    Single value keys are returned as is, composite keys as a tuple.
+    """
+    if token is None:
+        return None
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise InvalidCursor(token) from e
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursor(token)
+    try:
+        values = tuple(_key_value(value, type_) for value, type_ in zip(values, types))
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(token) from e
+    return values[0] if len(values) == 1 else values
+
+
+def page_size(limit: Optional[int]) -> int:
+    """
+    Clamp requested page size.
+    """
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate(query: Select, key, limit: Optional[int] = None, after: Optional[Any] = None) -> Select:
+    """
+    Apply keyset pagination (`WHERE key > :after ORDER BY key LIMIT :limit`) to a query.
+    Without limit the query is left unbounded.
+    """
+    if after is not None:
+        query = query.where(key > after)
+    if limit is not None:
+        query = query.order_by(key).limit(limit)
+    return query
+
+
+def page(items: list, rows: list, key: Union[str, tuple[str, ...]], limit: int) -> dict:
+    """
+    Build a page response. `next` is null on the last page.
+    A tuple `key` makes a composite cursor of those columns.
+    """
+    cursor = None
+    if rows and len(rows) >= limit:
+        keys = key if isinstance(key, tuple) else (key,)
+        cursor = encode_cursor(*(getattr(rows[-1], i) for i in keys))
+
+    return {"items": items, "next": cursor}
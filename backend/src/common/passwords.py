@@ -0,0 +1,21 @@
+from passlib.context import CryptContext
+
+# Runs in the password hasher processes too, every spawned process pays for the imports here
+
+PASSWORD_SCHEMES = ["pbkdf2_sha512", "md5_crypt"]
+DEPRECATED_SCHEMES = ["md5_crypt"]
+
+pwd_context = CryptContext(schemes=PASSWORD_SCHEMES, deprecated=DEPRECATED_SCHEMES)
+
+
+def hash_password(secret: str) -> str:
+    return pwd_context.hash(secret)
+
+
+def verify_password(secret: str, hash: bytes) -> bool:
+    return pwd_context.verify(secret, hash)
+
+
+def load_schemes():
+    # Loading the default scheme is what makes the first call of a process slow
+    pwd_context.handler()
@@ -0,0 +1,64 @@
+import json
+import os
+from typing import Any, Callable, Optional
+
+import pydantic_core
+from aiohttp import web
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return pydantic_core.to_jsonable_python(value)
+
+
+def _orjson_dumps(data: Any) -> bytes:
+    return orjson.dumps(data, default=_orjson_default)
+
+
+def _pydantic_dumps(data: Any) -> bytes:
+    return pydantic_core.to_json(data)
+
+
+def _json_dumps(data: Any) -> bytes:
+    return json.dumps(pydantic_core.to_jsonable_python(data), ensure_ascii=False).encode()
+
+
+ENCODERS: dict[str, Callable[[Any], bytes]] = {
+    "pydantic": _pydantic_dumps,
+    "json": _json_dumps,
+}
+if orjson is not None:
+    ENCODERS["orjson"] = _orjson_dumps
+
+
+def _encoder() -> Callable[[Any], bytes]:
+    # pydantic-core serializes models without building their dicts, orjson has to dump them first
+    name = os.getenv("JSON_ENCODER", "pydantic")
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown JSON_ENCODER {name}, expected one of {', '.join(ENCODERS)}")
+    return ENCODERS[name]
+
+
+_dumps = _encoder()
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Encode models, lists and dicts of them, datetimes and UUIDs to JSON bytes
+    with the JSON_ENCODER encoder: pydantic (default), orjson when installed, or json.
+    """
+    return _dumps(data)
+
+
+def json_response(data: Any, status: int = 200, headers: Optional[dict] = None) -> web.Response:
+    """
+    web.json_response that takes models as they are instead of their dicts.
+    """
+    return web.Response(body=dumps(data), status=status, headers=headers, content_type="application/json")
@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Only the standard library here: main.py imports this module first to time the imports after it
+PROCESS_START = time.perf_counter()
+
+# Seconds main.py took to import the application, forked workers inherit it
+_imports: Optional[float] = None
+
+
+def imports_done():
+    global _imports
+    _imports = time.perf_counter() - PROCESS_START
+
+
+class StartupProfile:
+    """
+    Durations of the startup phases of one worker, from the imports until it is ready for traffic.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {} if _imports is None else {"imports": _imports}
+        self.ready: Optional[float] = None
+        self.failed: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def mark_ready(self):
+        """
+        Seconds from create_app until ready.
+        """
+        self.ready = time.perf_counter() - self.started
+
+    def mark_failed(self, reason: str):
+        """
+        The worker will not become ready, retrying does not help.
+        """
+        self.failed = reason
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready is not None,
+            "failed": self.failed,
+            "seconds_to_ready": self.ready,
+            "phases": dict(self.phases),
+        }
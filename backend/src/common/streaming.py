@@ -0,0 +1,53 @@
+import logging
+from typing import Any, AsyncIterator, Callable
+
+from aiohttp import web
+
+from common.responses import dumps
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def stream_response(request: web.Request, rows: AsyncIterator, serialize: Callable[[Any], Any], format: str = "ndjson") -> web.StreamResponse:
+    """
+    Write rows to a chunked response as NDJSON lines or as one JSON array.
+    Rows are serialized one by one and flushed in CHUNK_SIZE pieces,
+    so memory does not grow with the amount of rows.
+    """
+    response = web.StreamResponse(status=200, headers={"Content-Type": STREAM_FORMATS[format]})
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    array = format == "json"
+    separator = b"," if array else b"\n"
+    buffer = bytearray(b"[" if array else b"")
+    first = True
+
+    try:
+        async for row in rows:
+            if array and not first:
+                buffer += separator
+            buffer += dumps(serialize(row))
+            if not array:
+                buffer += separator
+            first = False
+
+            if len(buffer) >= CHUNK_SIZE:
+                await response.write(bytes(buffer))
+                buffer.clear()
+
+        if array:
+            buffer += b"]"
+        await response.write(bytes(buffer))
+        await response.write_eof()
+    except Exception as e:
+        # Status is already sent, the only way to report the error is to break the connection
+        logging.error(e)
+        raise
+
+    return response
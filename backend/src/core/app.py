@@ -1,31 +1,144 @@
 import os
 import asyncio
+import logging
 from aiohttp import web
-from sqlalchemy.ext.asyncio import create_async_engine
-from core.orm import Base
-from aiohttp_pydantic import oas
+from core.docs import setup_docs
+from core.orm import trigram_installed
+from common.cache import cache_listener, setup_cache
+from common.db.pool import create_engine, pool_liveness, warm_pool
+from common.db.schema import SchemaOutdated, check_schema
+from common.db.replicas import Replicas
+from common.db.tracing import query_trace_middleware, setup_query_tracing
+from common.hashing import password_hasher
+from common.metrics import metrics_middleware, setup_metrics
+from common.startup import StartupProfile
 
+from common.logger.jwt_config import setup_token_cache
+from core.middlewares import auth_middleware, unit_of_work_middleware
 from core.routes import setup_routes
 
 
+async def dispose_engines(app: web.Application):
+    if app["db_read_engines"] is not None:
+        await app["db_read_engines"].dispose()
+    await app["db_engine"].dispose()
+
+
+# When the workers check the schema version: in the background before reporting ready (deferred),
+# in create_app before serving (startup) or never (off)
+SCHEMA_CHECK_MODES = ("deferred", "startup", "off")
+
+# Seconds between warm-up attempts while the database is unavailable
+WARM_UP_RETRY = 5
+
+
+async def _retrying(name: str, step):
+    while True:
+        try:
+            return await step()
+        except SchemaOutdated:
+            # Retrying does not migrate the database
+            raise
+        except Exception as e:
+            logging.error("Warm-up of the %s failed, retrying in %ss: %s", name, WARM_UP_RETRY, e)
+            await asyncio.sleep(WARM_UP_RETRY)
+
+
+async def _warm_up(app: web.Application):
+    profile: StartupProfile = app["startup"]
+    connections = os.getenv("POSTGRES_POOL_WARM")
+    connections = None if connections is None else int(connections)
+
+    async def warm_replicas():
+        # Best effort, a replica that is down is skipped until it comes back and does not keep the worker from ready
+        replicas = app["db_read_engines"]
+        if replicas is None:
+            return
+        warmed = await asyncio.gather(*(warm_pool(i, connections) for i in replicas.engines), return_exceptions=True)
+        for engine, e in zip(replicas.engines, warmed):
+            if isinstance(e, Exception):
+                logging.error("Warm-up of replica %s failed, marked down: %s", engine.url.render_as_string(), e)
+                replicas.mark_down(engine)
+
+    async def database():
+        with profile.phase("pool_warm_up"):
+            await asyncio.gather(warm_pool(app["db_engine"], connections), warm_replicas())
+        if app["schema_check"] == "deferred":
+            with profile.phase("schema_check"):
+                await check_schema(app)
+        with profile.phase("search_features"):
+            async with app["db_engine"].connect() as session:
+                app["features"]["search_fuzzy"] = await session.run_sync(trigram_installed)
+
+    async def hasher():
+        # Spawning the processes takes a second or more, logins would wait for it
+        with profile.phase("password_hasher"):
+            await app["password_hasher"].start()
+
+    steps = [asyncio.ensure_future(_retrying("database", database)), asyncio.ensure_future(_retrying("password hasher", hasher))]
+    try:
+        await asyncio.gather(*steps)
+    except SchemaOutdated as e:
+        for i in steps:
+            i.cancel()
+        profile.mark_failed(str(e))
+        logging.error("Worker %s will not be ready: %s", os.getpid(), e)
+        return
+
+    profile.mark_ready()
+    logging.info("Worker %s ready in %.3fs: %s", os.getpid(), profile.ready, ", ".join(f"{k} {v:.3f}s" for k, v in profile.phases.items()))
+
+
+async def warm_up(app: web.Application):
+    """
+    Warm the connection pools and the password hasher and check the schema in the background,
+    GET /api/v1/ready answers 200 once it is done. The worker serves requests meanwhile.
+    Only the primary gates readiness, and an outdated schema fails the warm-up for good.
+    """
+    app["tasks"]["warm_up"] = task = asyncio.create_task(_warm_up(app))
+
+    yield
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
 async def create_app():
-    app = web.Application(client_max_size=4 * 1024 * 1024)
-    app["db_engine"] = create_async_engine(
-        os.getenv("POSTGRES_URL"),
-        pool_size=4,
-        max_overflow=8,
-        pool_recycle=120,
-        pool_pre_ping=True,
-        future=True,
-    )
+    profile = StartupProfile()
+    schema_check = os.getenv("SCHEMA_CHECK", "deferred")
+    if schema_check not in SCHEMA_CHECK_MODES:
+        raise ValueError(f"SCHEMA_CHECK must be one of {', '.join(SCHEMA_CHECK_MODES)}")
+
+    app = web.Application(client_max_size=4 * 1024 * 1024, middlewares=[metrics_middleware, auth_middleware, query_trace_middleware, unit_of_work_middleware])
+    app["db_engine"] = create_engine(os.getenv("POSTGRES_URL"))
+
+    read_urls = [i.strip() for i in os.getenv("POSTGRES_READ_URL", "").split(",") if i.strip()]
+    app["db_read_engines"] = Replicas([create_engine(i) for i in read_urls], retry_after=float(os.getenv("REPLICA_RETRY", 30))) if read_urls else None
+    app.on_cleanup.append(dispose_engines)
     app["tasks"] = {}
-    setup_routes(app)
+    app["startup"] = profile
+    app["schema_check"] = schema_check
+    # Found by the warm-up, the app state is frozen by then
+    app["features"] = {"search_fuzzy": False}
 
-    async with app["db_engine"].begin() as session:
-        # FIXME: coment line below before deploying server
-        # await session.run_sync(Base.metadata.drop_all)
-        await session.run_sync(Base.metadata.create_all)
+    with profile.phase("setup"):
+        setup_metrics(app)
+        setup_query_tracing(app)
+        setup_cache(app)
+        setup_token_cache(app)
+        app.cleanup_ctx.append(cache_listener)
+        app.cleanup_ctx.append(password_hasher)
+        app.cleanup_ctx.append(pool_liveness)
+        app.cleanup_ctx.append(warm_up)
+        setup_routes(app)
+        setup_docs(app, title_spec="Service Name", version_spec="0.1.0")
 
-    oas.setup(app, title_spec="Service Name", version_spec="0.1.0")
+    # The schema is migrated by `alembic upgrade head` before deploying, workers only check its version
+    if schema_check == "startup":
+        with profile.phase("schema_check"):
+            await check_schema(app)
 
     return app
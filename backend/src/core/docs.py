@@ -0,0 +1,36 @@
+from importlib import resources
+from typing import Optional
+
+import jinja2
+from aiohttp import web
+from aiohttp_pydantic.oas.view import generate_oas
+from swagger_ui_bundle import swagger_ui_path
+
+
+def setup_docs(app: web.Application, version_spec: Optional[str] = None, title_spec: Optional[str] = None, url_prefix: str = "/oas"):
+    """
+    Same routes as aiohttp_pydantic.oas.setup, but the spec and the swagger page template are built
+    on the first request to them instead of at startup, and the spec is built once instead of on every request.
+    """
+    # The sub app state is frozen once started, the built documents go into this dict
+    built = {}
+
+    async def spec(request: web.Request) -> web.Response:
+        if "spec" not in built:
+            built["spec"] = web.json_response(generate_oas([app], version_spec, title_spec)).body
+        return web.Response(body=built["spec"], content_type="application/json")
+
+    async def index(request: web.Request) -> web.Response:
+        if "index" not in built:
+            template = jinja2.Template(resources.read_text("aiohttp_pydantic.oas", "index.j2"))
+            built["index"] = template.render({
+                "openapi_spec_url": request.app.router["spec"].canonical,
+                "static_url": request.app.router["static"].canonical,
+            })
+        return web.Response(text=built["index"], content_type="text/html", charset="utf-8")
+
+    docs = web.Application()
+    docs.router.add_get("/spec", spec, name="spec")
+    docs.router.add_static("/static", swagger_ui_path, name="static")
+    docs.router.add_get("", index, name="index")
+    app.add_subapp(url_prefix, docs)
@@ -0,0 +1,70 @@
+import os
+import re
+
+from aiohttp import web
+
+from common.db.session import unit_of_work
+from common.logger.jwt_config import decode_access
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# WAL position of the client's last write, replicas that did not replay it are not read from
+LSN_COOKIE = "last_write_lsn"
+
+LSN_PATTERN = re.compile(r"[0-9A-F]{1,8}/[0-9A-F]{1,8}")
+
+
+@web.middleware
+async def auth_middleware(request: web.Request, handler):
+    """
+    Put the user of a valid access token to request["user"], None otherwise.
+    """
+    request["user"] = None
+
+    access = request.headers.get("Authorization")
+    if access:
+        try:
+            request["user"] = await decode_access(request.app, access)
+        except web.HTTPUnauthorized:
+            pass
+
+    return await handler(request)
+
+
+@web.middleware
+async def unit_of_work_middleware(request: web.Request, handler):
+    """
+    Run the data access calls of a request in one connection and one transaction.
+    Committed for successful responses, rolled back for errors.
+    GET requests read from replicas when they are configured.
+    """
+    app = request.app
+
+    # Read-your-writes: the client sends back the WAL position of its last write with the cookie,
+    # so it holds whichever worker or instance serves the next request
+    replicas = app.get("db_read_engines")
+    record_lsn = replicas is not None and request.method not in SAFE_METHODS
+    min_lsn = request.cookies.get(LSN_COOKIE)
+    if min_lsn is not None and not LSN_PATTERN.fullmatch(min_lsn):
+        min_lsn = None
+    if request.method not in SAFE_METHODS:
+        replicas = None
+
+    error = None
+    async with unit_of_work(app, replicas, min_lsn, record_lsn) as uow:
+        try:
+            response = await handler(request)
+            status = response.status
+        except web.HTTPException as e:
+            # Redirects and other raised responses still commit
+            error, status = e, e.status
+        uow.rollback_only = status >= 400
+
+    if uow.commit_lsn is not None:
+        (response if error is None else error).set_cookie(
+            LSN_COOKIE, uow.commit_lsn, max_age=int(os.getenv("READ_YOUR_WRITES_SECONDS", 60)), httponly=True, samesite="Lax",
+        )
+
+    if error is not None:
+        raise error
+    return response
@@ -1,17 +1,21 @@
 import datetime
-from sqlalchemy import ForeignKey, String, Date, Time, text
+import uuid
+from sqlalchemy import FetchedValue, ForeignKey, Index, String, Date, Time, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy_utils.types.password import PasswordType
 from sqlalchemy.dialects.postgresql import UUID
 
+from common.passwords import DEPRECATED_SCHEMES, PASSWORD_SCHEMES
+
 from typing import Annotated
 
 class Base(DeclarativeBase):
     pass
 
 intpk = Annotated[int, mapped_column(primary_key=True, autoincrement=True)]
-uuidpk = Annotated[UUID, mapped_column(UUID() ,primary_key=True)]
+uuidpk = Annotated[UUID, mapped_column(UUID() ,primary_key=True, default=uuid.uuid4)]
 
 created_at = Annotated[datetime.datetime, mapped_column(server_default=text("TIMEZONE('utc', now())"))]
 updated_at = Annotated[datetime.datetime, mapped_column(
@@ -19,6 +23,18 @@ updated_at = Annotated[datetime.datetime, mapped_column(
     onupdate=datetime.datetime.now
 )]
 
+# Text search configuration of the exhibits search column, no stemming so Russian and English names match alike
+SEARCH_CONFIG = "simple"
+
+
+def trigram_installed(connection) -> bool:
+    return connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+
+
+def has_trigram(ddl, target, bind, **kw) -> bool:
+    return trigram_installed(bind)
+
+
 str_60 = Annotated[str, mapped_column(String(60))]
 str_60_unique = Annotated[str, mapped_column(String(60), unique=True)]
 str_256 = Annotated[str, mapped_column(String(256))]
@@ -35,7 +51,7 @@ class StorageModel(Base):
     __tablename__  =  "storages"
 
     id: Mapped[intpk]
-    room_id: Mapped[int] = mapped_column(ForeignKey("rooms.room"))
+    room_id: Mapped[int] = mapped_column(ForeignKey("rooms.room"), index=True)
     shelf: Mapped[str_256]
 
 class CategoriesModel(Base):
@@ -67,12 +83,27 @@ class ExhibitsModel(Base):
     id: Mapped[intpk]
     name: Mapped[str_60] = mapped_column(nullable=True)
     description: Mapped[str] = mapped_column(nullable=True)
-    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id", ondelete="SET NULL"))
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
     date_of_creation: Mapped[created_at]
     author: Mapped[str_256] = mapped_column(nullable=True) 
     material: Mapped[str_256] = mapped_column(nullable=True)
-    storage_id: Mapped[int] = mapped_column(ForeignKey("storages.id", ondelete="SET NULL"))
+    storage_id: Mapped[int] = mapped_column(ForeignKey("storages.id", ondelete="SET NULL"), nullable=True)
     # history_id: Mapped[int]  = mapped_column(ForeignKey("histories.id", ondelete="SET NULL"))
+    # Weighted name, author, material and description, set by the exhibits_search trigger (migration 0002)
+    search: Mapped[str] = mapped_column(TSVECTOR, FetchedValue(), nullable=True, deferred=True)
+
+    __table_args__ = (
+        # Filters of the exhibits list, id last so filtered pages are read in key order
+        Index("ix_exhibits_category_id", "category_id", "id"),
+        Index("ix_exhibits_storage_id", "storage_id", "id"),
+        Index("ix_exhibits_material", "material", "id"),
+        Index("ix_exhibits_author", "author", "id"),
+        Index("ix_exhibits_date_of_creation", "date_of_creation"),
+        Index("ix_exhibits_search", "search", postgresql_using="gin"),
+        # Fuzzy name and author matches, only where the pg_trgm extension is installed
+        Index("ix_exhibits_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(callable_=has_trigram),
+        Index("ix_exhibits_author_trgm", "author", postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"}).ddl_if(callable_=has_trigram),
+    )
 
 
 
@@ -82,12 +113,8 @@ class UsersModel(Base):
     id: Mapped[intpk]
     username: Mapped[str_60_unique]
     password: Mapped[str] = mapped_column(PasswordType(
-        schemes=[
-            'pbkdf2_sha512',
-            'md5_crypt'
-        ],
-
-        deprecated=['md5_crypt']
+        schemes=PASSWORD_SCHEMES,
+        deprecated=DEPRECATED_SCHEMES,
     ))
     fullname: Mapped[str_256]
     email: Mapped[str_60_unique] = mapped_column(nullable=True)
@@ -114,7 +141,14 @@ class TicketsModel(Base):
     activity_id: Mapped[int]  = mapped_column(ForeignKey("activities.id"))
     cost: Mapped[float]
     date: Mapped[created_at]
-    visited: Mapped[bool]
+    visited: Mapped[bool] = mapped_column(default=False)
+
+    __table_args__ = (
+        # Tickets of an activity for entrance scanning, in id order
+        Index("ix_tickets_activity_id_visited", "activity_id", "visited", "id"),
+        # Tickets of a user, newest first
+        Index("ix_tickets_user_id_date", "user_id", "date", "id"),
+    )
 
 
 class ReceiptsModel(Base):
@@ -1,41 +1,52 @@
 from aiohttp import web
 
-from endpoints.tickets import TicketsView
+from endpoints.tickets import ActivityTicketsView, TicketsBatchView, TicketsView, UserTicketsView
 from endpoints.activities import ActivitiesView
-from endpoints.exhibits import ExhibitsView
+from endpoints.exhibits import ExhibitsImportView, ExhibitsSearchView, ExhibitsView
 from endpoints.storages import StorageView
 from endpoints.categories import CategoryView
 from endpoints.rooms import RoomView
 from endpoints.authentification import Check, Login
 from endpoints.users import UserView
+from endpoints.monitoring import MetricsView, PoolView, ReadyView
 
 def setup_routes(app: web.Application):
     """Инициализация роутов"""
     app.add_routes(
         [
             # User
-            web.view('/api/v1/users', UserView),
+            web.view('/api/v1/users', UserView, name='users'),
             
             # Room
-            web.view('/api/v1/rooms', RoomView),
+            web.view('/api/v1/rooms', RoomView, name='rooms'),
 
             # Category
-            web.view('/api/v1/categories', CategoryView),
+            web.view('/api/v1/categories', CategoryView, name='categories'),
 
             # Storage
-            web.view('/api/v1/storage', StorageView),
+            web.view('/api/v1/storage', StorageView, name='storage'),
 
             # Exhibits
-            web.view('/api/v1/exhibits', ExhibitsView),
+            web.view('/api/v1/exhibits', ExhibitsView, name='exhibits'),
+            web.view('/api/v1/exhibits/import', ExhibitsImportView, name='exhibits_import'),
+            web.view('/api/v1/exhibits/search', ExhibitsSearchView, name='exhibits_search'),
 
             # Activity
-            web.view('/api/v1/activity', ActivitiesView),
+            web.view('/api/v1/activity', ActivitiesView, name='activity'),
 
             # Ticket
-            web.view('/api/v1/tickets', TicketsView),
+            web.view('/api/v1/tickets', TicketsView, name='tickets'),
+            web.view('/api/v1/tickets/batch', TicketsBatchView, name='tickets_batch'),
+            web.view('/api/v1/tickets/user', UserTicketsView, name='tickets_by_user'),
+            web.view('/api/v1/tickets/activity', ActivityTicketsView, name='tickets_by_activity'),
 
             # Auth
-            web.view('/api/v1/login', Login),
-            web.view('/api/v1/check', Check),
+            web.view('/api/v1/login', Login, name='login'),
+            web.view('/api/v1/check', Check, name='check'),
+
+            # Monitoring
+            web.view('/api/v1/pool', PoolView, name='pool'),
+            web.view('/api/v1/ready', ReadyView, name='ready'),
+            web.view('/metrics', MetricsView, name='metrics'),
         ]
 )
\ No newline at end of file
@@ -0,0 +1,76 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+from aiohttp import web
+
+# Connections one worker may open without the launcher or POSTGRES_MAX_CONNECTIONS: pool_size=4 + max_overflow=8
+DEFAULT_WORKER_CONNECTIONS = 12
+
+
+def pool_limits() -> tuple[int, int]:
+    """
+    Split POSTGRES_MAX_CONNECTIONS between APP_WORKERS workers.
+    A third of the worker share is kept open, the rest is overflow.
+    """
+    workers = max(1, int(os.getenv("APP_WORKERS", 1)))
+    total = int(os.getenv("POSTGRES_MAX_CONNECTIONS", DEFAULT_WORKER_CONNECTIONS * workers))
+
+    share = max(1, total // workers)
+    pool_size = max(1, share // 3)
+    return pool_size, share - pool_size
+
+
+def _serve(host: str, port: int):
+    from core.app import create_app
+
+    # Drop the launcher handlers inherited through fork, run_app installs its own
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    logging.info("Worker %s started", os.getpid())
+
+    web.run_app(create_app(), host=host, port=port, reuse_port=True, print=None)
+
+
+def run_workers(workers: int, host: str, port: int):
+    """
+    Pre-fork workers sharing one port with SO_REUSEPORT.
+    Each worker creates its own app and engine. Crashed workers are restarted,
+    SIGINT/SIGTERM are forwarded to the workers, which finish the in-flight requests before exiting.
+    """
+    os.environ["APP_WORKERS"] = str(workers)
+    context = multiprocessing.get_context("fork")
+    processes: dict[int, multiprocessing.Process] = {}
+    stopping = False
+
+    def spawn():
+        process = context.Process(target=_serve, args=(host, port))
+        process.start()
+        processes[process.sentinel] = process
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    for _ in range(workers):
+        spawn()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while processes:
+        for sentinel in wait(list(processes)):
+            process = processes.pop(sentinel)
+            process.join()
+            if not stopping:
+                logging.error("Worker %s exited with %s, restarting", process.pid, process.exitcode)
+                time.sleep(1)
+                spawn()
+
+    logging.info("All workers stopped")
@@ -1,13 +1,15 @@
 import logging
 from typing import Optional, Union
 
-from aiohttp import web
 from aiohttp_pydantic import PydanticView
 from aiohttp_pydantic.oas.typing import r200, r500
 
 from annotations.objects import Error, Ok, Activity, ActivityAddDTO
+from annotations.rows import from_row, from_rows
+from common.pagination import InvalidCursor, decode_cursor, page, page_size
 from core.orm import ActivitiesModel
 from common.db.pg_activity import add_activity, get_activities, get_activity_by_id, update_activity, delete_activity
+from common.responses import json_response
 
 class ActivitiesView(PydanticView):
 
@@ -27,21 +29,23 @@ class ActivitiesView(PydanticView):
         # try:
         result: ActivitiesModel = await add_activity(app, activity)
         
-        return web.json_response(Activity.model_validate(result).to_dict(), status=200)
+        return json_response(from_row(Activity, result), status=200)
 
         # except Exception as e:
         #     logging.error(e)
-        #     return web.json_response(
-        #         Error(error="Internal server error").model_dump(), status=500
+        #     return json_response(
+        #         Error(error="Internal server error"), status=500
         #     ) 
         
-    async def get(self, id: Optional[int] = None) -> Union[r200[list[Activity]], r500[Error]]:
+    async def get(self, id: Optional[int] = None, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r200[list[Activity]], r500[Error]]:
         """
         Get all Activities. If id set will return certain Activity by id. Else return all Activity in list
+        With limit or after set returns a page {items, next}, pass next as after to get the following page
 
         tags: Activity
         status codes:
             200: List of Activities or a certain Activity
+            400: Invalid cursor
         """
 
         app  = self.request.app
@@ -50,16 +54,22 @@ class ActivitiesView(PydanticView):
             if id:
                 result: list[Activity]  = await get_activity_by_id(app, id)
                 if not result:
-                    return web.json_response(Error(error="Not Found").model_dump(), status=404)
-                return web.json_response(Activity.model_validate(result).to_dict(), status=200)
+                    return json_response(Error(error="Not Found"), status=404)
+                return json_response(from_row(Activity, result), status=200)
+            elif limit is not None or after is not None:
+                size = page_size(limit)
+                result = (await get_activities(app, size, decode_cursor(after, int))).all()
+                return json_response(page(from_rows(Activity, result), result, "id", size), status=200)
             else:
                 result: list[ActivitiesModel] = await get_activities(app)
-                return web.json_response([Activity.model_validate(i).to_dict() for i in result], status=200)
+                return json_response(from_rows(Activity, result), status=200)
 
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 
@@ -76,11 +86,11 @@ class ActivitiesView(PydanticView):
 
         try:
             result = await update_activity(app, activity)
-            return web.json_response(Activity.model_validate(result).to_dict(), status=200)
+            return json_response(from_row(Activity, result), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+            Error(error="Internal server error"), status=500
             )
 
 
@@ -97,7 +107,7 @@ class ActivitiesView(PydanticView):
 
         try:
             result: ActivitiesModel = await delete_activity(app, id)
-            return web.json_response(Ok().model_dump(), status=200)
+            return json_response(Ok(), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(Error(error="Internal server error").model_dump(), status=500)
+            return json_response(Error(error="Internal server error"), status=500)
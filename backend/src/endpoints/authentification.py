@@ -7,7 +7,10 @@ from typing import Union
 
 from annotations.objects import Error, Ok, User, UserAddDTO
 from common.db.pg_users import get_user_by_username
-from common.logger.jwt_config import decode_access, encode_access
+from common.db.session import release
+from common.hashing import HasherBusy
+from common.logger.jwt_config import encode_access
+from common.responses import json_response
 
 
 class Login(PydanticView):
@@ -20,6 +23,7 @@ class Login(PydanticView):
         status codes:
             200: User authentificated successfully
             400: Bad request
+            503: Too many logins at once
         """
         app = self.request.app
 
@@ -27,27 +31,31 @@ class Login(PydanticView):
             check = await get_user_by_username(app, user.username)
 
             if not check:
-                return web.json_response(Error(error="Неправильный логин или пароль").model_dump(), status=400)
+                return json_response(Error(error="Неправильный логин или пароль"), status=400)
 
-            if (not user.password.get_secret_value() == check.password):
-                return web.json_response(Error(error="Неправильный логин или пароль").model_dump(), status=400)
+            # Verifying may wait in the hasher queue, the connection would sit idle in transaction meanwhile
+            await release(app)
+            if not await app["password_hasher"].verify(user.password.get_secret_value(), check.password):
+                return json_response(Error(error="Неправильный логин или пароль"), status=400)
             
 
-            access = await encode_access(app, check.id)
+            access = await encode_access(app, check)
 
-            response = web.json_response({"user_token": access, "user_id": check.id}, status=200)
+            response = json_response({"user_token": access, "user_id": check.id}, status=200)
 
             # TODO: Make refresh token encoding and sending it to cookie
             # refresh
             # response.set_cookie()
 
-            logging.info(f"User auth: {user.username}")
+            logging.info("User auth: %s", user.username)
             return response
 
+        except HasherBusy:
+            return json_response(Error(error="Service is busy, try again later"), status=503)
         except Exception as e:
-            logging.exception(f"Error: {e}")
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            logging.exception("Error: %s", e)
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 class Check(PydanticView):
@@ -60,26 +68,27 @@ class Check(PydanticView):
             401: User unauthorized
             500: Internal server error
         """
-        app = self.request.app
         try:
             access = self.request.headers.get("Authorization")
-            logging.debug(f"Access:  {access}")
+            logging.debug("Access:  %s", access)
             if not access:
-                return web.json_response(Error(error="No access token").model_dump(), status=401)
+                return json_response(Error(error="No access token"), status=401)
             
-            await decode_access(app, access)
-            logging.debug(f"Access:  {access}")
+            # Verified once per request by auth_middleware
+            if self.request["user"] is None:
+                raise web.HTTPUnauthorized
+            logging.debug("Access:  %s", access)
 
-            return web.json_response(Ok().model_dump(), status=201)            
+            return json_response(Ok(), status=201)            
 
         except web.HTTPUnauthorized:
-            logging.debug(f"Access:  Access token expired")
+            logging.debug("Access:  Access token expired")
             raise web.HTTPFound('/login')
-            return web.json_response(Error(error="Access token expired").model_dump(), status=401)
+            return json_response(Error(error="Access token expired"), status=401)
         except Exception as e:
-            logging.exception(f"Error: {e}")
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            logging.exception("Error: %s", e)
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 class Refresh(PydanticView):
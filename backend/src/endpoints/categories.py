@@ -1,13 +1,15 @@
 import logging
 from typing import Optional, Union
 
-from aiohttp import web
 from aiohttp_pydantic import PydanticView
 from aiohttp_pydantic.oas.typing import r200, r500
 
 from annotations.objects import Error, Ok, Category, CategoryAddDTO
+from annotations.rows import from_row, from_rows
+from common.pagination import InvalidCursor, decode_cursor, page, page_size
 from core.orm import CategoriesModel
 from common.db.pg_categories import add_category, update_category, get_all_categories, get_category_by_id, delete_category
+from common.responses import json_response
 
 class CategoryView(PydanticView):
 
@@ -27,21 +29,23 @@ class CategoryView(PydanticView):
         try:
             result: CategoriesModel = await add_category(app, category)
             
-            return web.json_response(Category.model_validate(result).model_dump(), status=200)
+            return json_response(from_row(Category, result), status=200)
 
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             ) 
         
-    async def get(self, id: Optional[int] = None) -> Union[r200[list[Category]], r500[Error]]:
+    async def get(self, id: Optional[int] = None, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r200[list[Category]], r500[Error]]:
         """
         Get all Categories. If id set will return certain category by id. Else return all categories in list
+        With limit or after set returns a page {items, next}, pass next as after to get the following page
 
         tags: Category
         status codes:
             200: List of categories
+            400: Invalid cursor
         """
 
         app  = self.request.app
@@ -50,16 +54,22 @@ class CategoryView(PydanticView):
             if id:
                 result: list[Category]  = await get_category_by_id(app, id)
                 if not result:
-                    return web.json_response(Error(error="Not Found").model_dump(), status=404)
-                return web.json_response(Category.model_validate(result).model_dump(), status=200)
+                    return json_response(Error(error="Not Found"), status=404)
+                return json_response(from_row(Category, result), status=200)
+            elif limit is not None or after is not None:
+                size = page_size(limit)
+                result = await get_all_categories(app, size, decode_cursor(after, int))
+                return json_response(page(from_rows(Category, result), result, "id", size), status=200)
             else:
                 result: list[CategoriesModel] = await get_all_categories(app)
-                return web.json_response([Category.model_validate(i).model_dump() for i in result], status=200)
+                return json_response(from_rows(Category, result), status=200)
 
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 
@@ -76,11 +86,11 @@ class CategoryView(PydanticView):
 
         try:
             result = await update_category(app, category)
-            return web.json_response(Category.model_validate(result).model_dump(), status=200)
+            return json_response(from_row(Category, result), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+            Error(error="Internal server error"), status=500
             )
 
 
@@ -97,7 +107,7 @@ class CategoryView(PydanticView):
 
         try:
             result: CategoriesModel = await delete_category(app, id)
-            return web.json_response(Ok().model_dump(), status=200)
+            return json_response(Ok(), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(Error(error="Internal server error").model_dump(), status=500)
+            return json_response(Error(error="Internal server error"), status=500)
@@ -1,16 +1,33 @@
 import logging
+from datetime import datetime
 from typing import Optional, Union
 
-from aiohttp import web
 from aiohttp_pydantic import PydanticView
-from aiohttp_pydantic.oas.typing import r200, r500
-
-from annotations.objects import Category, Error, Ok, Exhibit, ExhibitAddDTO, Storage
-from annotations.objects import CategoryAddDTO, StorageAddDTO
+from aiohttp_pydantic.oas.typing import r200, r400, r415, r500
+
+from annotations.objects import Category, Error, Ok, Exhibit, ExhibitAddDTO, ExhibitFilter, Storage
+from annotations.objects import CategoryAddDTO, ImportResult, StorageAddDTO
+from annotations.rows import construct, from_row
+from common.importing import IMPORT_FORMATS, ImportReport, csv_rows, ndjson_rows, validated
+from common.pagination import InvalidCursor, decode_cursor, page, page_size
+from common.streaming import STREAM_FORMATS, stream_response
 from common.db.pg_storages import add_storage, get_storage_by_id, get_storage_by_info, update_storage
 from common.db.pg_categories import add_category, get_category_by_id, get_category_by_name, update_category
 from core.orm import ExhibitsModel
-from common.db.pg_exhibits import add_exhibit, get_exhibit_by_id, get_exhibits, update_exhibit, delete_exhibit
+from common.db.pg_exhibits import add_exhibit, import_exhibits, get_exhibit_with_relations_by_id, get_exhibits_with_relations, search_exhibits, stream_exhibits_with_relations, update_exhibit, delete_exhibit
+from common.responses import json_response
+
+
+def exhibit_from_row(row) -> Exhibit:
+    """
+    Build an exhibit from a row outer joined with its category and storage.
+    The row comes from our database, so it is not validated again.
+    """
+
+    category = None if row.category_id is None else construct(Category, {"id": row.category_id, "name": row.category_name})
+    storage = None if row.storage_id is None else construct(Storage, {"id": row.storage_id, "room_id": row.storage_room_id, "shelf": row.storage_shelf})
+
+    return construct(Exhibit, {"id": row.id, "name": row.name, "description": row.description, "date_of_creation": row.date_of_creation, "author": row.author, "material": row.material, "category": category, "storage": storage})
 
 
 class ExhibitsView(PydanticView):
@@ -35,65 +52,70 @@ class ExhibitsView(PydanticView):
             storage = await get_storage_by_id(app, result.storage_id)
             category = await get_category_by_id(app, result.category_id)
 
-            storage = Storage.model_validate(storage)
-            category = Category.model_validate(category)
+            storage = from_row(Storage, storage)
+            category = from_row(Category, category)
 
         
         
-            return web.json_response(Exhibit(id = result.id, name = result.name, description=result.description, date_of_creation=result.date_of_creation, author=result.author, material=result.material, category=category, storage=storage).to_dict(), status=200)
+            return json_response(Exhibit(id = result.id, name = result.name, description=result.description, date_of_creation=result.date_of_creation, author=result.author, material=result.material, category=category, storage=storage), status=200)
 
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             ) 
         
-    async def get(self, id: Optional[int] = None) -> Union[r200[list[Exhibit]], r500[Error]]:
+    async def get(self, id: Optional[int] = None, limit: Optional[int] = None, after: Optional[str] = None, stream: Optional[str] = None,
+                  category_id: Optional[int] = None, storage_id: Optional[int] = None, room_id: Optional[int] = None,
+                  material: Optional[str] = None, author: Optional[str] = None,
+                  created_from: Optional[datetime] = None, created_to: Optional[datetime] = None) -> Union[r200[list[Exhibit]], r500[Error]]:
         """
         Get all exhibits. If id set will return certain exhibit by id. Else return all exhibits in list
+        Filters narrow the list: category_id, storage_id, room_id, exact material and author,
+        created_from and created_to bound date_of_creation inclusively
+        With limit or after set returns a page {items, next}, pass next as after to get the following page
+        With stream set to ndjson or json streams all exhibits as chunked NDJSON lines or a JSON array
 
         tags: Exhibit
         status codes:
             200: List of exhibits or a certain storage
+            400: Invalid cursor or stream format
         """
 
         app  = self.request.app
 
+        filters = ExhibitFilter(category_id=category_id, storage_id=storage_id, room_id=room_id, material=material, author=author, created_from=created_from, created_to=created_to)
+        if filters.is_empty():
+            filters = None
+
+        if stream is not None:
+            if stream not in STREAM_FORMATS:
+                return json_response(Error(error="Unknown stream format"), status=400)
+            return await stream_response(self.request, stream_exhibits_with_relations(app, filters=filters), exhibit_from_row, stream)
+
         try:
             if id:
-                result = await get_exhibit_by_id(app, id)
+                result = await get_exhibit_with_relations_by_id(app, id)
                 logging.debug(result)
                 
                 if not result:
-                    return web.json_response(Error(error="Not Found").model_dump(), status=404)
+                    return json_response(Error(error="Not Found"), status=404)
 
-                storage = await get_storage_by_id(app, result.storage_id)
-                category = await get_category_by_id(app, result.category_id)
-
-                storage = Storage.model_validate(storage)
-                category = Category.model_validate(category)
-
-                return web.json_response(Exhibit(id = result.id, name = result.name, description=result.description, date_of_creation=result.date_of_creation, author=result.author, material=result.material, category=category, storage=storage).to_dict(), status=200)
+                return json_response(exhibit_from_row(result), status=200)
+            elif limit is not None or after is not None:
+                size = page_size(limit)
+                result = (await get_exhibits_with_relations(app, size, decode_cursor(after, int), filters)).all()
+                return json_response(page([exhibit_from_row(i) for i in result], result, "id", size), status=200)
             else:
-                result: list[ExhibitsModel] = await get_exhibits(app)
-                _ = []
-                
-                for i in result:
-
-                    storage = await get_storage_by_id(app, i.storage_id)
-                    category = await get_category_by_id(app, i.category_id)
-
-                    storage = Storage.model_validate(storage)
-                    category = Category.model_validate(category)
-
-                    _.append(Exhibit(id = i.id, name = i.name, description=i.description, date_of_creation=i.date_of_creation, author=i.author, material=i.material, category=category, storage=storage).to_dict())
-
-                return web.json_response(_, status=200)
+                result = await get_exhibits_with_relations(app, filters=filters)
+                return json_response([exhibit_from_row(i) for i in result], status=200)
 
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 
@@ -110,24 +132,26 @@ class ExhibitsView(PydanticView):
 
         try:
 
-            await update_category(app, exhibit.category)
-            await update_storage(app, exhibit.storage)
+            if exhibit.category is not None:
+                await update_category(app, exhibit.category)
+            if exhibit.storage is not None:
+                await update_storage(app, exhibit.storage)
 
             result = await update_exhibit(app, exhibit)
             
-            storage = await get_storage_by_id(app, result.storage_id)
-            category = await get_category_by_id(app, result.category_id)
+            storage = None if result.storage_id is None else await get_storage_by_id(app, result.storage_id)
+            category = None if result.category_id is None else await get_category_by_id(app, result.category_id)
 
-            storage = Storage.model_validate(storage)
-            category = Category.model_validate(category)
+            storage = None if storage is None else from_row(Storage, storage)
+            category = None if category is None else from_row(Category, category)
 
 
-            return web.json_response(Exhibit(id = result.id, name = result.name, description=result.description, date_of_creation=result.date_of_creation, author=result.author, material=result.material, category=category, storage=storage).to_dict(), status=200)
+            return json_response(Exhibit(id = result.id, name = result.name, description=result.description, date_of_creation=result.date_of_creation, author=result.author, material=result.material, category=category, storage=storage), status=200)
        
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+            Error(error="Internal server error"), status=500
             )
 
 
@@ -144,7 +168,76 @@ class ExhibitsView(PydanticView):
 
         try:
             result: ExhibitsModel = await delete_exhibit(app, id)
-            return web.json_response(Ok().model_dump(), status=200)
+            return json_response(Ok(), status=200)
+        except Exception as e:
+            logging.error(e)
+            return json_response(Error(error="Internal server error"), status=500)
+
+
+class ExhibitsImportView(PydanticView):
+
+    async def post(self) -> Union[r200[ImportResult], r415[Error], r500[Error]]:
+        """
+        Bulk import exhibits from a CSV upload with a header row (text/csv)
+        or from one JSON object per line (application/x-ndjson). Rows are validated like a single exhibit,
+        valid rows are loaded with COPY in one transaction, invalid rows are reported by number
+
+        tags: Exhibit
+        status codes:
+            200: Import report with errors of skipped rows
+            415: Unsupported upload format
+        """
+
+        app = self.request.app
+
+        format = IMPORT_FORMATS.get(self.request.content_type)
+        if format is None:
+            return json_response(Error(error="Upload must be text/csv or application/x-ndjson"), status=415)
+
+        parse = csv_rows if format == "csv" else ndjson_rows
+        report = ImportReport()
+
+        try:
+            await import_exhibits(app, validated(parse(self.request.content), ExhibitAddDTO, report), report)
+            return json_response(report.to_dict(), status=200)
+
+        except Exception as e:
+            logging.error(e)
+            return json_response(
+                Error(error="Internal server error"), status=500
+            )
+
+
+class ExhibitsSearchView(PydanticView):
+
+    async def get(self, q: str, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r200[list[Exhibit]], r400[Error], r500[Error]]:
+        """
+        Search exhibits by name, author, material and description, best matches first.
+        Accepts web search syntax: "quoted phrases", OR, -excluded words. Returns a page {items, next},
+        pass next as after to get the following page
+
+        tags: Exhibit
+        status codes:
+            200: Page of matching exhibits
+            400: Empty query or invalid cursor
+        """
+
+        app = self.request.app
+
+        if not q.strip():
+            return json_response(Error(error="Empty query"), status=400)
+
+        try:
+            cursor = decode_cursor(after, float, int)
+
+            size = page_size(limit)
+            result = await search_exhibits(app, q, size, cursor, fuzzy=app["features"]["search_fuzzy"])
+            return json_response(page([exhibit_from_row(i) for i in result], result, ("rank", "id"), size), status=200)
+
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(Error(error="Internal server error").model_dump(), status=500)
+            return json_response(
+                Error(error="Internal server error"), status=500
+            )
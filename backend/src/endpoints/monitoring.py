@@ -0,0 +1,60 @@
+from typing import Union
+
+from aiohttp import web
+from aiohttp_pydantic import PydanticView
+from aiohttp_pydantic.oas.typing import r200, r503
+
+from common.db.pool import pool_stats
+from common.metrics import render_metrics
+from common.responses import json_response
+
+
+class PoolView(PydanticView):
+
+    async def get(self) -> Union[r200[dict]]:
+        """
+        Connection pool telemetry of this worker: primary pool and every read replica pool
+
+        tags: Monitoring
+        status codes:
+            200: Pool counters, checkout wait histogram and current usage
+        """
+        app = self.request.app
+
+        replicas = app["db_read_engines"]
+        return json_response({
+            "primary": pool_stats(app["db_engine"]),
+            "replicas": [] if replicas is None else [
+                {"url": i.url.render_as_string(), "healthy": replicas.healthy(i), **pool_stats(i)}
+                for i in replicas.engines
+            ],
+        }, status=200)
+
+
+class ReadyView(PydanticView):
+
+    async def get(self) -> Union[r200[dict], r503[dict]]:
+        """
+        Readiness of this worker for the load balancer: ready once its connection pools and password hasher
+        are warmed and the schema version is checked. Has the timings of the startup phases
+
+        tags: Monitoring
+        status codes:
+            200: Ready
+            503: Still warming up, or failed for good with the reason in `failed` (database schema behind this build)
+        """
+        profile = self.request.app["startup"]
+        return json_response(profile.stats(), status=200 if profile.ready is not None else 503)
+
+
+class MetricsView(PydanticView):
+
+    async def get(self) -> Union[r200[str]]:
+        """
+        Request, query, pool, cache and password hasher metrics of this worker in Prometheus text format
+
+        tags: Monitoring
+        status codes:
+            200: Metrics
+        """
+        return web.Response(body=render_metrics(self.request.app).encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
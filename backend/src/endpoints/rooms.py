@@ -1,13 +1,15 @@
 import logging
-from typing import Union
+from typing import Optional, Union
 
-from aiohttp import web
 from aiohttp_pydantic import PydanticView
 from aiohttp_pydantic.oas.typing import r200, r500
 
 from annotations.objects import Error, Ok, Room, UpdateRoomDTO
+from annotations.rows import from_row, from_rows
+from common.pagination import InvalidCursor, decode_cursor, page, page_size
 from core.orm import RoomsModel
 from common.db.pg_room import add_room, delete_room, get_all_rooms, update_room_number
+from common.responses import json_response
 
 class RoomView(PydanticView):
 
@@ -27,34 +29,43 @@ class RoomView(PydanticView):
         try:
             result: RoomsModel = await add_room(app, room)
             
-            return web.json_response(Room.model_validate(result).model_dump(), status=200)
+            return json_response(from_row(Room, result), status=200)
 
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             ) 
         
-    async def get(self) -> Union[r200[list[Room]], r500[Error]]:
+    async def get(self, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r200[list[Room]], r500[Error]]:
         """
         Get all rooms
+        With limit or after set returns a page {items, next}, pass next as after to get the following page
 
         tags: Room
         status codes:
             200: List of rooms
+            400: Invalid cursor
         """
 
         app  = self.request.app
 
         try:
+            if limit is not None or after is not None:
+                size = page_size(limit)
+                result = await get_all_rooms(app, size, decode_cursor(after, int))
+                return json_response(page(from_rows(Room, result), result, "room", size), status=200)
+
             result: list[RoomsModel] = await get_all_rooms(app)
-            logging.debug(f"get_rooms: {result=}")
-            return web.json_response([Room.model_validate(i).model_dump() for i in result], status=200)
+            logging.debug("get_rooms: result=%r", result)
+            return json_response(from_rows(Room, result), status=200)
 
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 
@@ -71,11 +82,11 @@ class RoomView(PydanticView):
 
         try:
             result = await update_room_number(app, update.old_room, update.new_room)
-            return web.json_response(Room.model_validate(result).model_dump(), status=200)
+            return json_response(from_row(Room, result), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+            Error(error="Internal server error"), status=500
             )
 
 
@@ -92,7 +103,7 @@ class RoomView(PydanticView):
 
         try:
             result: RoomsModel = await delete_room(app, number)
-            return web.json_response(Ok().model_dump(), status=200)
+            return json_response(Ok(), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(Error(error="Internal server error").model_dump(), status=500)
+            return json_response(Error(error="Internal server error"), status=500)
@@ -1,13 +1,15 @@
 import logging
 from typing import Optional, Union
 
-from aiohttp import web
 from aiohttp_pydantic import PydanticView
 from aiohttp_pydantic.oas.typing import r200, r500
 
 from annotations.objects import Error, Ok, Storage, StorageAddDTO
+from annotations.rows import from_row, from_rows
+from common.pagination import InvalidCursor, decode_cursor, page, page_size
 from core.orm import CategoriesModel
 from common.db.pg_storages import add_storage, get_all_storages, get_storage_by_id, update_storage, delete_storage
+from common.responses import json_response
 
 
 class StorageView(PydanticView):
@@ -28,21 +30,23 @@ class StorageView(PydanticView):
         try:
             result: CategoriesModel = await add_storage(app, storage)
             
-            return web.json_response(Storage.model_validate(result).model_dump(), status=200)
+            return json_response(from_row(Storage, result), status=200)
 
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             ) 
         
-    async def get(self, id: Optional[int] = None) -> Union[r200[list[Storage]], r500[Error]]:
+    async def get(self, id: Optional[int] = None, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r200[list[Storage]], r500[Error]]:
         """
         Get all Storagies. If id set will return certain storage by id. Else return all storagies in list
+        With limit or after set returns a page {items, next}, pass next as after to get the following page
 
         tags: Storage
         status codes:
             200: List of storagies or a certain storage
+            400: Invalid cursor
         """
 
         app  = self.request.app
@@ -51,16 +55,22 @@ class StorageView(PydanticView):
             if id:
                 result: list[Storage]  = await get_storage_by_id(app, id)
                 if not result:
-                    return web.json_response(Error(error="Not Found").model_dump(), status=404)
-                return web.json_response(Storage.model_validate(result).model_dump(), status=200)
+                    return json_response(Error(error="Not Found"), status=404)
+                return json_response(from_row(Storage, result), status=200)
+            elif limit is not None or after is not None:
+                size = page_size(limit)
+                result = await get_all_storages(app, size, decode_cursor(after, int))
+                return json_response(page(from_rows(Storage, result), result, "id", size), status=200)
             else:
                 result: list[CategoriesModel] = await get_all_storages(app)
-                return web.json_response([Storage.model_validate(i).model_dump() for i in result], status=200)
+                return json_response(from_rows(Storage, result), status=200)
 
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 
@@ -77,11 +87,11 @@ class StorageView(PydanticView):
 
         try:
             result = await update_storage(app, storage)
-            return web.json_response(Storage.model_validate(result).model_dump(), status=200)
+            return json_response(from_row(Storage, result), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+            Error(error="Internal server error"), status=500
             )
 
 
@@ -98,7 +108,7 @@ class StorageView(PydanticView):
 
         try:
             result: CategoriesModel = await delete_storage(app, id)
-            return web.json_response(Ok().model_dump(), status=200)
+            return json_response(Ok(), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(Error(error="Internal server error").model_dump(), status=500)
+            return json_response(Error(error="Internal server error"), status=500)
@@ -1,13 +1,20 @@
 import logging
+from datetime import datetime
 from typing import Optional, Union
+from uuid import UUID
+from sqlalchemy.exc import IntegrityError
 
-from aiohttp import web
 from aiohttp_pydantic import PydanticView
-from aiohttp_pydantic.oas.typing import r200, r500
+from pydantic import UUID4
+from aiohttp_pydantic.oas.typing import r200, r400, r409, r500
 
-from annotations.objects import Error, Ok, Ticket, TicketAddDTO
+from annotations.objects import Error, Ok, Ticket, TicketAddDTO, TicketsBatchAddDTO, TicketsBatchDeleteDTO, TicketsBatchVisitDTO
+from annotations.rows import from_row, from_rows
+from common.pagination import InvalidCursor, decode_cursor, page, page_size
+from common.streaming import STREAM_FORMATS, stream_response
 from core.orm import TicketsModel
-from common.db.pg_tickets import add_ticket, get_all_tickets, get_ticket_by_id, update_ticket, delete_ticket
+from common.db.pg_tickets import add_ticket, add_tickets, get_activity_tickets, get_all_tickets, get_ticket_by_id, get_user_tickets, set_tickets_visited, stream_tickets, update_ticket, delete_ticket, delete_tickets
+from common.responses import json_response
 
 
 class TicketsView(PydanticView):
@@ -28,39 +35,53 @@ class TicketsView(PydanticView):
         try:
             result: TicketsModel = await add_ticket(app, ticket)
             
-            return web.json_response(Ticket.model_validate(result).to_dict(), status=200)
+            return json_response(from_row(Ticket, result), status=200)
 
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             ) 
         
-    async def get(self, id: Optional[int] = None) -> Union[r200[list[Ticket]], r500[Error]]:
+    async def get(self, id: Optional[UUID4] = None, limit: Optional[int] = None, after: Optional[str] = None, stream: Optional[str] = None) -> Union[r200[list[Ticket]], r500[Error]]:
         """
         Get all Tickets. If id set will return certain Ticket by id. Else return all Tickets in list
+        With limit or after set returns a page {items, next}, pass next as after to get the following page
+        With stream set to ndjson or json streams all Tickets as chunked NDJSON lines or a JSON array
 
         tags: Ticket
         status codes:
             200: List of Tickets or a certain Ticket
+            400: Invalid cursor or stream format
         """
 
         app  = self.request.app
 
+        if stream is not None:
+            if stream not in STREAM_FORMATS:
+                return json_response(Error(error="Unknown stream format"), status=400)
+            return await stream_response(self.request, stream_tickets(app), lambda i: from_row(Ticket, i), stream)
+
         try:
             if id:
                 result: TicketsModel = await get_ticket_by_id(app, id)
                 if not result:
-                    return web.json_response(Error(error="Not Found").model_dump(), status=404)
-                return web.json_response(Ticket.model_validate(result).to_dict(), status=200)
+                    return json_response(Error(error="Not Found"), status=404)
+                return json_response(from_row(Ticket, result), status=200)
+            elif limit is not None or after is not None:
+                size = page_size(limit)
+                result = (await get_all_tickets(app, size, decode_cursor(after, UUID))).all()
+                return json_response(page(from_rows(Ticket, result), result, "id", size), status=200)
             else:
                 result: list[TicketsModel] = await get_all_tickets(app)
-                return web.json_response([Ticket.model_validate(i).to_dict() for i in result], status=200)
+                return json_response(from_rows(Ticket, result), status=200)
 
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
             )
 
 
@@ -77,15 +98,15 @@ class TicketsView(PydanticView):
 
         try:
             result = await update_ticket(app, ticket)
-            return web.json_response(Ticket.model_validate(result).to_dict(), status=200)
+            return json_response(from_row(Ticket, result), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+            Error(error="Internal server error"), status=500
             )
 
 
-    async def delete(self, id: int) -> Union[r200[Ok], r500[Error]]:
+    async def delete(self, id: UUID4) -> Union[r200[Ok], r500[Error]]:
         """
         Delete a Ticket by number
 
@@ -98,7 +119,132 @@ class TicketsView(PydanticView):
 
         try:
             result: TicketsModel = await delete_ticket(app, id)
-            return web.json_response(Ok().model_dump(), status=200)
+            return json_response(Ok(), status=200)
+        except Exception as e:
+            logging.error(e)
+            return json_response(Error(error="Internal server error"), status=500)
+
+
+class TicketsBatchView(PydanticView):
+
+    async def post(self, batch: TicketsBatchAddDTO) -> Union[r200[list[Ticket]], r409[Error], r500[Error]]:
+        """
+        Create up to 1000 Tickets in one request
+
+        tags: Ticket
+
+        status codes:
+            200: Tickets created successfully
+            409: Unknown user or activity, no ticket created
+
+        """
+
+        app = self.request.app
+
+        try:
+            result: list[TicketsModel] = await add_tickets(app, batch.tickets)
+            return json_response(from_rows(Ticket, result), status=200)
+
+        except IntegrityError:
+            return json_response(Error(error="Unknown user or activity"), status=409)
+        except Exception as e:
+            logging.error(e)
+            return json_response(
+                Error(error="Internal server error"), status=500
+            )
+
+    async def put(self, batch: TicketsBatchVisitDTO) -> Union[r200[list[Ticket]], r500[Error]]:
+        """
+        Mark up to 1000 Tickets as visited (or not visited) by uuid
+
+        tags: Ticket
+        status codes:
+            200: Updated Tickets, unknown uuids are skipped
+        """
+
+        app  = self.request.app
+
+        try:
+            result: list[TicketsModel] = await set_tickets_visited(app, batch.uuids, batch.visited)
+            return json_response(from_rows(Ticket, result), status=200)
+        except Exception as e:
+            logging.error(e)
+            return json_response(
+            Error(error="Internal server error"), status=500
+            )
+
+    async def delete(self, batch: TicketsBatchDeleteDTO) -> Union[r200[Ok], r500[Error]]:
+        """
+        Delete up to 1000 Tickets by uuid
+
+        tags: Ticket
+        status codes:
+            200: Tickets deleted successfully
+        """
+
+        app = self.request.app
+
+        try:
+            result: list[TicketsModel] = await delete_tickets(app, batch.uuids)
+            return json_response(Ok(), status=200)
+        except Exception as e:
+            logging.error(e)
+            return json_response(Error(error="Internal server error"), status=500)
+
+
+class UserTicketsView(PydanticView):
+
+    async def get(self, user: int, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r200[list[Ticket]], r400[Error], r500[Error]]:
+        """
+        Get Tickets of a user, newest first. Returns a page {items, next},
+        pass next as after to get the following page
+
+        tags: Ticket
+        status codes:
+            200: Page of Tickets of the user
+            400: Invalid cursor
+        """
+
+        app = self.request.app
+
+        try:
+            size = page_size(limit)
+            result = await get_user_tickets(app, user, size, decode_cursor(after, datetime, UUID))
+            return json_response(page(from_rows(Ticket, result), result, ("date", "id"), size), status=200)
+
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(Error(error="Internal server error").model_dump(), status=500)
+            return json_response(
+                Error(error="Internal server error"), status=500
+            )
+
+
+class ActivityTicketsView(PydanticView):
+
+    async def get(self, activity: int, visited: Optional[bool] = None, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r200[list[Ticket]], r400[Error], r500[Error]]:
+        """
+        Get Tickets of an activity, not yet visited first. With visited set only the visited or not yet visited ones.
+        Returns a page {items, next}, pass next as after to get the following page
+
+        tags: Ticket
+        status codes:
+            200: Page of Tickets of the activity
+            400: Invalid cursor
+        """
+
+        app = self.request.app
+
+        try:
+            size = page_size(limit)
+            result = await get_activity_tickets(app, activity, size, decode_cursor(after, bool, UUID), visited)
+            return json_response(page(from_rows(Ticket, result), result, ("visited", "id"), size), status=200)
+
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
+        except Exception as e:
+            logging.error(e)
+            return json_response(
+                Error(error="Internal server error"), status=500
+            )
@@ -1,5 +1,4 @@
 import logging
-from aiohttp import web
 from sqlalchemy.exc import IntegrityError
 from typing import Optional, Union
 
@@ -7,7 +6,11 @@ from aiohttp_pydantic import PydanticView
 from aiohttp_pydantic.oas.typing import r200, r201, r409, r500
 
 from annotations.objects import Ok, Error, UserAddDTO, User, UsersTable
+from annotations.rows import from_row, from_rows
+from common.pagination import InvalidCursor, decode_cursor, page, page_size
+from common.hashing import HasherBusy
 from common.db.pg_users import add_user, get_user_by_id, get_user_by_username, get_users, update_user, delete_user
+from common.responses import json_response
 from core.orm import UsersModel
 
 
@@ -22,31 +25,35 @@ class UserView(PydanticView):
             201: User added successfully
             400: Bad request
             409: User already exists
+            503: Too many registrations at once
         """ 
         app = self.request.app
 
         if len(user.password.get_secret_value()) < 8:
-            return web.json_response(
-                Error(error="Password must be at least 8 characters long").model_dump(),
+            return json_response(
+                Error(error="Password must be at least 8 characters long"),
                 status=400
             )
 
         try:
             result = await add_user(app, user)
         except IntegrityError:
-            return web.json_response(Error(error="User already exists").model_dump(), status=409)
+            return json_response(Error(error="User already exists"), status=409)
+        except HasherBusy:
+            return json_response(Error(error="Service is busy, try again later"), status=503)
 
 
         if result:
-            return web.json_response(Ok(ok="User added successfully").model_dump(), status=201)
+            return json_response(Ok(ok="User added successfully"), status=201)
         
-        return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+        return json_response(
+            Error(error="Internal server error"), status=500
         )
     
-    async def get(self, id: Optional[int] = None, username: Optional[str] = None) -> Union[r201[Ok], r409[Error]]:
+    async def get(self, id: Optional[int] = None, username: Optional[str] = None, limit: Optional[int] = None, after: Optional[str] = None) -> Union[r201[Ok], r409[Error]]:
         """
         Get a user
+        With limit or after set returns a page {items, next}, pass next as after to get the following page
 
         tags: User
         
@@ -61,23 +68,29 @@ class UserView(PydanticView):
             if id:
                 result: User  = await get_user_by_id(app, id)
                 if not result:
-                    return web.json_response(Error(error="Not Found").model_dump(), status=404)
-                return web.json_response(UsersTable.model_validate(result).model_dump(), status=200)
+                    return json_response(Error(error="Not Found"), status=404)
+                return json_response(from_row(UsersTable, result), status=200)
             
             if username:
                 result: User  = await get_user_by_username(app, username)
                 if not result:
-                    return web.json_response(Error(error="Not Found").model_dump(), status=404)
-                return web.json_response(UsersTable.model_validate(result).model_dump(), status=200)
+                    return json_response(Error(error="Not Found"), status=404)
+                return json_response(from_row(UsersTable, result), status=200)
 
+            elif limit is not None or after is not None:
+                size = page_size(limit)
+                result = (await get_users(app, size, decode_cursor(after, int))).all()
+                return json_response(page(from_rows(UsersTable, result), result, "id", size), status=200)
             else:
                 result: list[UsersModel] = await get_users(app)
-                return web.json_response([UsersTable.model_validate(i).model_dump() for i in result], status=200)
+                return json_response(from_rows(UsersTable, result), status=200)
 
+        except InvalidCursor:
+            return json_response(Error(error="Invalid cursor"), status=400)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-                Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+                Error(error="Internal server error"), status=500
         )
 
 
@@ -94,19 +107,21 @@ class UserView(PydanticView):
 
         try:
             if len(user.password.get_secret_value()) < 8:
-                return web.json_response(
-                    Error(error="Password must be at least 8 characters long").model_dump(),
+                return json_response(
+                    Error(error="Password must be at least 8 characters long"),
                     status=400
                 )
             
             result = await update_user(app, user)
 
 
-            return web.json_response(Ok().model_dump(), status=201)
+            return json_response(Ok(), status=201)
+        except HasherBusy:
+            return json_response(Error(error="Service is busy, try again later"), status=503)
         except Exception as e:
             logging.error(e)
-            return web.json_response(
-            Error(error="Internal server error").model_dump(), status=500
+            return json_response(
+            Error(error="Internal server error"), status=500
             )
 
 
@@ -123,7 +138,7 @@ class UserView(PydanticView):
 
         try:
             result: UsersModel = await delete_storage(app, id)
-            return web.json_response(Ok().model_dump(), status=200)
+            return json_response(Ok(), status=200)
         except Exception as e:
             logging.error(e)
-            return web.json_response(Error(error="Internal server error").model_dump(), status=500)
+            return json_response(Error(error="Internal server error"), status=500)
@@ -1,16 +1,33 @@
+from common import startup
+
+import argparse
 import logging
 import os
 from aiohttp import web
 from dotenv import load_dotenv
 
+from common.logger.log_config import setup_logging
 from core.app import create_app
+from core.workers import run_workers
+
+startup.imports_done()
 
 load_dotenv()
 
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.DEBUG, filename='backend.log', filemode='w')
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=int(os.getenv('APP_WORKERS', 1)), help="Number of pre-forked worker processes")
+    args = parser.parse_args()
+
+    host, port = '0.0.0.0', int(os.getenv('APP_PORT', 8080))
+
+    setup_logging(args.workers)
     logging.info("Starting server...")
-    app = create_app()
 
-    web.run_app(app, host='0.0.0.0', port=int(os.getenv('APP_PORT', 8080)))
+    if args.workers > 1:
+        run_workers(args.workers, host, port)
+    else:
+        app = create_app()
+
+        web.run_app(app, host=host, port=port)
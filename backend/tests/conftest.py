@@ -0,0 +1,30 @@
+"""
+The tests run against the database in POSTGRES_URL and are skipped when it is not set.
+They migrate it and add rows to it, so never point it at a real database.
+"""
+import os
+
+import pytest
+
+from common.db.schema import upgrade
+from core.app import create_app
+
+pytest_plugins = ["aiohttp.pytest_plugin"]
+
+
+@pytest.fixture(scope="session")
+def postgres_url() -> str:
+    url = os.getenv("POSTGRES_URL")
+    if not url:
+        pytest.skip("POSTGRES_URL is not set")
+    upgrade(url)
+    return url
+
+
+@pytest.fixture
+async def http(postgres_url, aiohttp_client, monkeypatch):
+    """
+    Client of the app running in process.
+    """
+    monkeypatch.setenv("TOKEN_KEY", os.getenv("TOKEN_KEY", "test"))
+    return await aiohttp_client(await create_app())
@@ -0,0 +1,61 @@
+"""
+Exhibit updates are not hidden by the categories and storages caches.
+"""
+import random
+
+from aiohttp.test_utils import TestClient
+
+
+def names(exhibit: dict) -> tuple:
+    return exhibit["category"]["name"], exhibit["storage"]["shelf"]
+
+
+async def cached_exhibit(http: TestClient) -> tuple[int, dict, dict, dict]:
+    """
+    A new exhibit whose category and storage are in the caches.
+    """
+    suffix = random.randrange(10 ** 9)
+    room = random.randrange(10 ** 6, 10 ** 9)
+    assert (await http.post("/api/v1/rooms", json={"room": room})).status == 200
+    category = await (await http.post("/api/v1/categories", json={"name": f"ceramics {suffix}"})).json()
+    storage = await (await http.post("/api/v1/storage", json={"room_id": room, "shelf": f"A {suffix}"})).json()
+    exhibit = await (await http.post("/api/v1/exhibits", json={
+        "name": "vase", "description": "cache check", "category_id": category["id"], "storage_id": storage["id"],
+    })).json()
+
+    await http.get("/api/v1/categories", params={"id": category["id"]})
+    await http.get("/api/v1/storage", params={"id": storage["id"]})
+    return room, category, storage, exhibit
+
+
+def renamed(exhibit: dict, category: dict, storage: dict) -> dict:
+    suffix = random.randrange(10 ** 9)
+    return {**exhibit, "category": {**category, "name": f"porcelain {suffix}"}, "storage": {**storage, "shelf": f"B {suffix}"}}
+
+
+async def test_put_renames_cached_relations(http):
+    room, category, storage, exhibit = await cached_exhibit(http)
+    update = renamed(exhibit, category, storage)
+
+    response = await http.put("/api/v1/exhibits", json=update)
+    assert response.status == 200
+    put = await response.json()
+    get = await (await http.get("/api/v1/exhibits", params={"id": exhibit["id"]})).json()
+
+    assert names(put) == names(update)
+    assert names(get) == names(update)
+    assert put == get
+
+
+async def test_failed_put_keeps_committed_names(http):
+    room, category, storage, exhibit = await cached_exhibit(http)
+    update = renamed(exhibit, category, storage)
+    assert (await http.put("/api/v1/exhibits", json=update)).status == 200
+
+    # The storage update fails on the room foreign key after the category update, both roll back
+    failing = {**update, "category": {**update["category"], "name": "faience"}, "storage": {**update["storage"], "room_id": room + 1}}
+    response = await http.put("/api/v1/exhibits", json=failing)
+    get = await (await http.get("/api/v1/exhibits", params={"id": exhibit["id"]})).json()
+
+    assert response.status >= 400
+    assert names(get) == names(update)
@@ -0,0 +1,49 @@
+"""
+DB_QUERY_BUDGET_STRICT fails the requests going over DB_QUERY_BUDGET.
+"""
+import os
+
+import pytest
+from aiohttp import web
+from sqlalchemy import text
+
+from common.db.session import read_transaction
+from core.app import create_app
+
+BUDGET = 2
+
+
+async def queries(request: web.Request) -> web.Response:
+    async with read_transaction(request.app) as session:
+        for _ in range(int(request.query["n"])):
+            await session.execute(text("SELECT 1"))
+    return web.json_response({})
+
+
+@pytest.fixture
+def budget_client(postgres_url, aiohttp_client, monkeypatch):
+    async def client(strict: bool):
+        monkeypatch.setenv("TOKEN_KEY", os.getenv("TOKEN_KEY", "test"))
+        monkeypatch.setenv("DB_QUERY_BUDGET", str(BUDGET))
+        monkeypatch.setenv("DB_QUERY_BUDGET_STRICT", "true" if strict else "false")
+        app = await create_app()
+        app.router.add_get("/queries", queries)
+        return await aiohttp_client(app)
+
+    return client
+
+
+async def test_strict_fails_over_budget(budget_client):
+    http = await budget_client(strict=True)
+
+    assert (await http.get("/queries", params={"n": BUDGET})).status == 200
+    assert (await http.get("/queries", params={"n": BUDGET + 1})).status == 500
+
+
+async def test_not_strict_only_warns(budget_client, caplog):
+    http = await budget_client(strict=False)
+
+    response = await http.get("/queries", params={"n": BUDGET + 1})
+
+    assert response.status == 200
+    assert "budget is 2" in caplog.text
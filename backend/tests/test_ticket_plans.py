@@ -0,0 +1,88 @@
+"""
+The per-user and per-activity ticket listings read their composite index
+instead of scanning or sorting the tickets table.
+
+The tickets are seeded up to TICKETS on first run, the plans only tell at that volume.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from common.db.pg_tickets import activity_tickets_query, user_tickets_query
+from load_test import seed
+
+TICKETS = 1_000_000
+USERS = 10_000
+ACTIVITIES = 1000
+LIMIT = 100
+
+
+def nodes(plan: dict):
+    yield plan
+    for i in plan.get("Plans", []):
+        yield from nodes(i)
+
+
+def problems(plan: dict, index: str) -> list[str]:
+    """
+    Reasons the plan is not an index read of `index`.
+    """
+    found = list(nodes(plan))
+    result = []
+    if not any(i.get("Index Name") == index for i in found):
+        result.append(f"does not use {index}")
+    if any(i["Node Type"] == "Seq Scan" and i.get("Relation Name") == "tickets" for i in found):
+        result.append("scans tickets")
+    if any(i["Node Type"] in ("Sort", "Incremental Sort") for i in found):
+        result.append("sorts")
+    return result
+
+
+async def explain(session, statement) -> dict:
+    sql = statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    result = await session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    return result.scalar()[0]
+
+
+@pytest.fixture(scope="module")
+def seeded(postgres_url) -> tuple[int, int]:
+    ids = asyncio.run(seed(postgres_url, {
+        "rooms": 10, "storages": 0, "categories": 0, "exhibits": 0,
+        "users": USERS, "activities": ACTIVITIES, "tickets": TICKETS,
+    }))
+    return int(ids["users"][0]), int(ids["activities"][0])
+
+
+@pytest.fixture
+async def session(postgres_url, loop):
+    engine = create_async_engine(postgres_url)
+    async with engine.connect() as session:
+        yield session
+    await engine.dispose()
+
+
+async def test_user_tickets(seeded, session):
+    user, _ = seeded
+    last = (await session.execute(user_tickets_query(user, LIMIT))).all()
+    after = (last[-1].date, last[-1].id) if last else None
+
+    for statement in (user_tickets_query(user, LIMIT), user_tickets_query(user, LIMIT, after)):
+        plan = await explain(session, statement)
+        assert not problems(plan["Plan"], "ix_tickets_user_id_date"), plan
+
+
+async def test_activity_tickets(seeded, session):
+    _, activity = seeded
+    last = (await session.execute(activity_tickets_query(activity, LIMIT, visited=False))).all()
+    after = (last[-1].visited, last[-1].id) if last else None
+
+    for statement in (
+        activity_tickets_query(activity, LIMIT, visited=False),
+        activity_tickets_query(activity, LIMIT, after, visited=False),
+        activity_tickets_query(activity, LIMIT),
+    ):
+        plan = await explain(session, statement)
+        assert not problems(plan["Plan"], "ix_tickets_activity_id_visited"), plan